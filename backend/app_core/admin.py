@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import UploadedDataset
+from .models import UploadedDataset, UploadJob
 
 @admin.register(UploadedDataset)
 class DatasetAdmin(admin.ModelAdmin):
     list_display = ('name', 'uploaded_at', 'row_count')
     readonly_fields = ('uploaded_at', 'summary')
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'rows_processed', 'created_at')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+
+import pyarrow as pa
+import pyarrow.feather as feather
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog import materialize_stats
+from .columnar import columnar_path, load_frame, load_table, segment_path
+from .ingest import write_segment
+from .metrics import rows_processed, span
+from .models import UploadedDataset
+from .reports import remove_reports
+from .sketches import DISTINCT_COLS, SketchSet
+from .stats import extend_statistics
+from .tasks import queue_report
+from .utils import SummaryAccumulator
+
+# Sketches of the rows stored so far. Datasets from before co-moments were
+# kept get theirs rebuilt from the cache once.
+def _stored_sketches(ds, numeric):
+    sketches = SketchSet.from_dict(ds.sketches or {})
+    if sketches.comoments is None:
+        sketches = SketchSet()
+        cols = numeric + [c for c in DISTINCT_COLS if c in load_table(ds).schema.names]
+        sketches.add(load_frame(ds, columns=cols), numeric)
+    return sketches
+
+# the summary with the new rows folded in, old rows are not read again
+def extend_summary(summary, df, sketches):
+    acc = SummaryAccumulator()
+    acc.add(df)
+    types = Counter(summary.get('type_distribution', {}))
+    types.update({str(k): int(v) for k, v in acc.types.items()})
+    out = dict(summary)
+    out['total_count'] = summary.get('total_count', 0) + acc.rows
+    out['averages'] = {col: round(sketches.moments[col].mean, 2) if sketches.moments[col].n else 0.0
+                       for col in summary.get('averages', {})}
+    out['type_distribution'] = {k: v for k, v in types.most_common()}
+    out.update(extend_statistics(summary, df, sketches))
+    return out
+
+# Appends the rows of a csv (same columns) to a dataset. They are written
+# to a new Arrow segment first, then the row is locked while the summary,
+# sketches and stats tables are extended from their stored state plus the
+# new rows only. Raises IngestError for a bad or mismatched csv.
+def append_rows(ds, f, digest):
+    schema = load_table(ds).schema
+    numeric = [field.name for field in schema if pa.types.is_floating(field.type)]
+    fd, tmp = tempfile.mkstemp(suffix='.arrow', dir=os.path.dirname(columnar_path(ds)))
+    os.close(fd)
+    try:
+        with span('parse'):
+            write_segment(f, schema, tmp)
+        stat_cols = numeric + [c for c in ['Type'] + DISTINCT_COLS if c in schema.names]
+        df = feather.read_table(tmp, columns=stat_cols, memory_map=True).to_pandas()
+
+        with span('summary'), transaction.atomic():
+            ds = UploadedDataset.objects.select_for_update().get(id=ds.id)
+            sketches = _stored_sketches(ds, numeric)
+            sketches.add(df, numeric)
+            ds.summary = extend_summary(ds.summary, df, sketches)
+            ds.sketches = sketches.to_dict()
+            ds.row_count += len(df)
+            # chained, so the etag and query cache keys move on with the rows
+            ds.content_hash = hashlib.sha256(f'{ds.content_hash}:{digest}'.encode()).hexdigest()
+            ds.segments += 1
+            ds.updated_at = timezone.now()
+            os.replace(tmp, segment_path(ds, ds.segments))
+            ds.save(update_fields=['summary', 'sketches', 'row_count', 'content_hash',
+                                   'segments', 'updated_at'])
+            materialize_stats(ds)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    rows_processed(len(df), 'append')
+    remove_reports(ds)
+    queue_report(ds.id)
+    return ds
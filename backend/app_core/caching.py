@@ -0,0 +1,90 @@
+import hashlib
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.response import Response
+
+# datasets only change through appends, which move both validators on, so
+# let clients revalidate every time and answer with a body-less 304 when
+# they already have it
+CACHE_CONTROL = 'private, no-cache'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_BLOCK = 64 * 1024
+
+# strong etag per representation: dataset content (its hash is chained on
+# every append, the segment count moves with it), negotiated format and the
+# exact query; variant covers anything else the body depends on (e.g. report template)
+def dataset_etag(request, ds, variant=''):
+    version = f'{ds.content_hash or ds.uploaded_at.isoformat()}:{ds.segments}'
+    renderer = getattr(request, 'accepted_renderer', None)
+    fmt = renderer.format if renderer else ''
+    key = f'{ds.id}:{version}:{variant}:{fmt}:{request.get_full_path()}'
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+def _not_modified(request, etag, last_modified):
+    inm = request.META.get('HTTP_IF_NONE_MATCH')
+    if inm:
+        # weak comparison: compressed responses carry W/ etags
+        tags = [t.removeprefix('W/') for t in parse_etags(inm)]
+        return '*' in tags or etag in tags
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(last_modified) <= since
+
+def _stamp(resp, etag, last_modified):
+    resp['ETag'] = etag
+    resp['Last-Modified'] = http_date(last_modified)
+    resp['Cache-Control'] = CACHE_CONTROL
+    return resp
+
+# Returns 304 if the client's copy is current, otherwise calls build()
+# and adds the validators to its response.
+def conditional_response(request, ds, build, variant=''):
+    etag = dataset_etag(request, ds, variant)
+    last_modified = (ds.updated_at or ds.uploaded_at).timestamp()
+    if _not_modified(request, etag, last_modified):
+        return _stamp(Response(status=304), etag, last_modified)
+    resp = build()
+    if resp.status_code in (200, 206):
+        _stamp(resp, etag, last_modified)
+    return resp
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(RANGE_BLOCK, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+# FileResponse with single-range "Range: bytes=a-b" support
+def ranged_file_response(request, path, content_type, filename):
+    size = os.path.getsize(path)
+    m = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if not m or m.groups() == ('', ''):
+        resp = FileResponse(open(path, 'rb'), content_type=content_type,
+                            as_attachment=True, filename=filename)
+        resp['Accept-Ranges'] = 'bytes'
+        return resp
+
+    first, last = m.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        resp = HttpResponse(status=416)
+        resp['Content-Range'] = f'bytes */{size}'
+        return resp
+
+    resp = StreamingHttpResponse(_iter_range(path, start, end - start + 1),
+                                 status=206, content_type=content_type)
+    resp['Content-Range'] = f'bytes {start}-{end}/{size}'
+    resp['Content-Length'] = str(end - start + 1)
+    resp['Accept-Ranges'] = 'bytes'
+    resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
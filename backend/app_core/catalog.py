@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+
+from .models import DatasetColumnStat, DatasetTypeCount, UploadedDataset
+from .utils import FILTER_RE
+
+LOOKUPS = {'==': 'exact', '>': 'gt', '>=': 'gte', '<': 'lt', '<=': 'lte'}
+
+# stats table rows for one dataset, read from its summary
+def stat_rows(ds):
+    summary = ds.summary or {}
+    stats = [
+        DatasetColumnStat(dataset=ds, column=col, metric=m, value=vals.get(m))
+        for col, vals in summary.get('columns', {}).items()
+        for m in DatasetColumnStat.METRICS
+    ]
+    types = [DatasetTypeCount(dataset=ds, type=t, count=n)
+             for t, n in summary.get('type_distribution', {}).items()]
+    return stats, types
+
+# (re)write the stats tables for a dataset from its summary
+def materialize_stats(ds):
+    stats, types = stat_rows(ds)
+    with transaction.atomic():
+        DatasetColumnStat.objects.filter(dataset=ds).delete()
+        DatasetTypeCount.objects.filter(dataset=ds).delete()
+        DatasetColumnStat.objects.bulk_create(stats)
+        DatasetTypeCount.objects.bulk_create(types)
+
+# "Pressure.mean>7" -> (column, metric, lookup, value), ValueError if bad
+def parse_stat_filter(expr):
+    m = FILTER_RE.match(expr)
+    if not m or '.' not in m.group(1):
+        raise ValueError(f'Bad filter: {expr}, expected column.metric<op>number')
+    ref, op, val = m.groups()
+    col, metric = parse_stat_ref(ref)
+    if op not in LOOKUPS:
+        raise ValueError(f'Unsupported operator in {expr}')
+    try:
+        val = float(val)
+    except ValueError:
+        raise ValueError(f'{ref} expects a number')
+    return col, metric, LOOKUPS[op], val
+
+def parse_stat_ref(ref):
+    col, _, metric = ref.rpartition('.')
+    if not col or metric not in DatasetColumnStat.METRICS:
+        raise ValueError(f'Bad stat {ref}, metric must be one of {", ".join(DatasetColumnStat.METRICS)}')
+    return col, metric
+
+def _stat(col, metric):
+    return DatasetColumnStat.objects.filter(dataset=OuterRef('pk'), column=col, metric=metric)
+
+# datasets matching every stat filter and containing every type, with the
+# referenced stats annotated; all of it runs as one SQL query
+def find_datasets(filters=(), types=(), ordering=None):
+    qs = UploadedDataset.objects.all()
+    refs = {}
+    for col, metric, lookup, val in filters:
+        qs = qs.filter(Exists(_stat(col, metric).filter(**{f'value__{lookup}': val})))
+        refs[f'{col}.{metric}'] = (col, metric)
+    for t in types:
+        qs = qs.filter(Exists(DatasetTypeCount.objects.filter(dataset=OuterRef('pk'), type=t)))
+    if ordering:
+        refs[ordering.lstrip('-')] = parse_stat_ref(ordering.lstrip('-'))
+
+    names = {}
+    for i, (ref, (col, metric)) in enumerate(refs.items()):
+        names[ref] = f'stat_{i}'
+        qs = qs.annotate(**{names[ref]: Subquery(_stat(col, metric).values('value')[:1])})
+    if ordering:
+        field = F(names[ordering.lstrip('-')])
+        key = field.desc(nulls_last=True) if ordering.startswith('-') else field.asc(nulls_last=True)
+        qs = qs.order_by(key, '-uploaded_at')
+    return qs, names
+
+# per-type totals across every stored dataset
+def type_totals():
+    return (DatasetTypeCount.objects.values('type')
+            .annotate(datasets=Count('dataset'), rows=Sum('count'))
+            .order_by('-rows', 'type'))
@@ -0,0 +1,55 @@
+import os
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .ingest import ingest_csv
+
+# typed columnar copy of an upload, stored next to the csv as Arrow IPC.
+# It is written uncompressed so reads can memory-map it instead of decoding.
+def columnar_path(ds):
+    return os.path.splitext(ds.csv_file.path)[0] + '.arrow'
+
+# build the cache from the raw csv, used for backfill and as a fallback
+def build_columnar(ds):
+    with ds.csv_file.open('rb') as f:
+        return ingest_csv(f, columnar_path(ds))
+
+# Rows appended later live in numbered segments of their own. They are named
+# after the dataset, so a cache shared by duplicate uploads is never changed.
+def segment_path(ds, n):
+    return os.path.splitext(ds.csv_file.path)[0] + f'.{ds.id}-{n}.arrow'
+
+# the memory-mapped cache; one that is missing, truncated or garbled is
+# rebuilt from the csv
+def _open_cache(ds):
+    path = columnar_path(ds)
+    try:
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        build_columnar(ds)
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+# Arrow table backed by the memory-mapped cache and any appended segments,
+# nothing is read up front
+def load_table(ds, columns=None):
+    tables = [_open_cache(ds)] + [feather.read_table(segment_path(ds, n), memory_map=True)
+                                  for n in range(1, getattr(ds, 'segments', 0) + 1)]
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+    return table if columns is None else table.select(columns)
+
+# dataframe for a dataset, read from the memory-mapped cache
+def load_frame(ds, columns=None):
+    return load_table(ds, columns).to_pandas()
+
+def remove_columnar(ds):
+    if not ds.csv_file:
+        return
+    path = columnar_path(ds)
+    if os.path.exists(path):
+        os.remove(path)
+
+def remove_segments(ds):
+    for n in range(1, getattr(ds, 'segments', 0) + 1):
+        path = segment_path(ds, n)
+        if os.path.exists(path):
+            os.remove(path)
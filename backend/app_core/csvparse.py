@@ -0,0 +1,212 @@
+import codecs
+import csv
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from django.conf import settings
+
+try:
+    import polars as pl
+except ImportError:  # the polars engine is optional
+    pl = None
+
+ENGINES = ('c', 'pyarrow', 'polars')
+SAMPLE_BYTES = 256 * 1024
+DELIMITERS = ',;\t|'
+NUMERIC, CATEGORY, TIMESTAMP, TEXT = 'numeric', 'category', 'timestamp', 'text'
+# always categorical, whatever the sample looks like
+CATEGORY_COLS = ['Type']
+# other text columns become categorical below this distinct/rows ratio
+CATEGORY_RATIO = 0.1
+CATEGORY_MIN_ROWS = 50
+
+# A value past the sample did not fit the inferred type.
+class SchemaMismatch(ValueError):
+    pass
+
+# What a csv looks like, inferred from its head. kinds maps each raw header
+# (as written, so parsers can be told about it) to numeric, category,
+# timestamp or text; names holds the stripped column names in order and
+# numeric the ones that are numeric whatever they hold. With loose=True
+# numeric and timestamp columns are read as text and coerced, bad values
+# becoming NaN/NaT.
+class CsvSchema:
+    def __init__(self, delimiter, encoding, kinds, date_formats=None, row_bytes=100, loose=False, numeric=()):
+        self.delimiter, self.encoding = delimiter, encoding
+        self.kinds = kinds
+        self.date_formats = date_formats or {}
+        self.row_bytes = row_bytes
+        self.loose = loose
+        self.numeric = set(numeric)
+
+    @property
+    def names(self):
+        return [c.strip() for c in self.kinds]
+
+    def columns(self, kind):
+        return [c.strip() for c, k in self.kinds.items() if k == kind]
+
+    # Schema to re-read with after a SchemaMismatch. Scans the columns the
+    # sample typed as numeric or timestamp; those holding a value that does
+    # not convert become text, so nothing is lost. Only the forced numeric
+    # columns turn bad values into NaN. Leaves the position alone.
+    def loosened(self, f):
+        checked = [c for c, k in self.kinds.items()
+                   if k in (NUMERIC, TIMESTAMP) and c.strip() not in self.numeric]
+        kinds = dict(self.kinds)
+        if checked:
+            pos = f.tell()
+            for chunk in pd.read_csv(f, sep=self.delimiter, encoding=self.encoding, dtype=str,
+                                     usecols=checked, chunksize=1 << 20):
+                for col in checked:
+                    vals = chunk[col].dropna().str.strip()
+                    if kinds[col] == NUMERIC:
+                        bad = pd.to_numeric(vals, errors='coerce').isna()
+                    else:
+                        bad = pd.to_datetime(vals, format=self.date_formats.get(col), errors='coerce').isna()
+                    if bad.any():
+                        kinds[col] = TEXT
+            f.seek(pos)
+        return CsvSchema(self.delimiter, self.encoding, kinds, self.date_formats, self.row_bytes,
+                         loose=True, numeric=self.numeric)
+
+    def _raw(self, kind):
+        return [c for c, k in self.kinds.items() if k == kind]
+
+def _decode(raw):
+    if raw.startswith(codecs.BOM_UTF8):
+        return raw[len(codecs.BOM_UTF8):].decode('utf-8', errors='ignore'), 'utf-8-sig'
+    try:
+        # a multi-byte character may be cut at the end of the sample
+        return raw.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(raw) - 3:
+            return raw[:e.start].decode('utf-8'), 'utf-8'
+        return raw.decode('latin-1'), 'latin-1'
+
+def _kind(col, vals, numeric):
+    if col.strip() in numeric or not len(vals) or pd.to_numeric(vals, errors='coerce').notna().all():
+        return NUMERIC, None
+    if col.strip() in CATEGORY_COLS:
+        return CATEGORY, None
+    fmt = pd.tseries.api.guess_datetime_format(vals.iloc[0])
+    if fmt and pd.to_datetime(vals, format=fmt, errors='coerce').notna().all():
+        return TIMESTAMP, fmt
+    if len(vals) >= CATEGORY_MIN_ROWS and vals.nunique() <= len(vals) * CATEGORY_RATIO:
+        return CATEGORY, None
+    return TEXT, None
+
+# Reads the head of a csv (leaving the position alone) to work out its
+# encoding, delimiter and column types. numeric names columns that are
+# numeric no matter what the sample holds; empty columns count as numeric,
+# as pandas would have guessed.
+def infer_schema(f, numeric=(), sample_bytes=SAMPLE_BYTES):
+    pos = f.tell()
+    raw = f.read(sample_bytes)
+    f.seek(pos)
+    text, encoding = _decode(raw)
+    if len(raw) == sample_bytes and '\n' in text:
+        text = text[:text.rindex('\n') + 1]  # drop the partial last row
+    lines = text.count('\n') or 1
+    try:
+        delimiter = csv.Sniffer().sniff(text[:8192], delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+
+    sample = pd.read_csv(io.StringIO(text), sep=delimiter, dtype=str)
+    kinds, date_formats = {}, {}
+    for col in sample.columns:
+        kinds[col], fmt = _kind(col, sample[col].dropna().str.strip(), set(numeric))
+        if fmt:
+            date_formats[col] = fmt
+    return CsvSchema(delimiter, encoding, kinds, date_formats, row_bytes=max(len(raw) // lines, 1),
+                     numeric=numeric)
+
+# numeric and timestamp columns read as text get converted here (loose mode
+# and the engines without a timestamp parser); headers lose their padding
+def _finish(df, schema, converted=()):
+    for col, kind in schema.kinds.items():
+        if col in converted:
+            continue
+        if kind == NUMERIC and (schema.loose or df[col].dtype != 'float64'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif kind == TIMESTAMP:
+            df[col] = pd.to_datetime(df[col], format=schema.date_formats[col], errors='coerce')
+    df.columns = df.columns.str.strip()
+    return df
+
+def _c_chunks(f, schema, chunk_rows):
+    dtype = {c: 'category' for c in schema._raw(CATEGORY)}
+    dtype.update({c: 'str' for c in schema._raw(TEXT) + schema._raw(TIMESTAMP)})
+    dtype.update({c: 'str' if schema.loose else 'float64' for c in schema._raw(NUMERIC)})
+    reader = pd.read_csv(f, sep=schema.delimiter, encoding=schema.encoding, dtype=dtype,
+                         chunksize=chunk_rows)
+    try:
+        for chunk in reader:
+            yield _finish(chunk, schema)
+    except pd.errors.ParserError:
+        raise
+    except ValueError as e:
+        raise SchemaMismatch(str(e)) from e
+
+def _arrow_chunks(f, schema, chunk_rows):
+    types = {c: pa.dictionary(pa.int32(), pa.string()) for c in schema._raw(CATEGORY)}
+    types.update({c: pa.string() for c in schema._raw(TEXT)})
+    types.update({c: pa.string() if schema.loose else pa.float64() for c in schema._raw(NUMERIC)})
+    # Arrow parses ISO 8601 itself, other formats are left to pandas
+    done = [c for c in schema._raw(TIMESTAMP)
+            if not schema.loose and schema.date_formats[c].startswith('%Y-%m-%d') and '%z' not in schema.date_formats[c]]
+    for c in schema._raw(TIMESTAMP):
+        types[c] = pa.timestamp('us') if c in done else pa.string()
+    try:
+        # the first block is already converted while opening
+        reader = pacsv.open_csv(
+            f,
+            read_options=pacsv.ReadOptions(encoding='utf8' if schema.encoding.startswith('utf') else schema.encoding,
+                                           block_size=max(chunk_rows * schema.row_bytes, 1 << 20)),
+            parse_options=pacsv.ParseOptions(delimiter=schema.delimiter),
+            convert_options=pacsv.ConvertOptions(column_types=types, strings_can_be_null=True))
+        empty = True
+        for batch in reader:
+            empty = False
+            yield _finish(batch.to_pandas(), schema, converted=done)
+        # a header-only file has no batches; give one empty chunk like the C parser
+        if empty:
+            yield _finish(reader.schema.empty_table().to_pandas(), schema, converted=done)
+    except pa.ArrowInvalid as e:
+        if 'conversion error' in str(e).lower():
+            raise SchemaMismatch(str(e)) from e
+        raise
+
+def _polars_chunks(path, schema, chunk_rows):
+    types = {c: pl.Categorical for c in schema._raw(CATEGORY)}
+    types.update({c: pl.String for c in schema._raw(TEXT) + schema._raw(TIMESTAMP)})
+    types.update({c: pl.String if schema.loose else pl.Float64 for c in schema._raw(NUMERIC)})
+    reader = pl.read_csv_batched(path, separator=schema.delimiter, schema_overrides=types,
+                                 batch_size=chunk_rows)
+    try:
+        while batches := reader.next_batches(1):
+            yield _finish(batches[0].to_pandas(), schema)
+    except pl.exceptions.ComputeError as e:
+        raise SchemaMismatch(str(e)) from e
+
+def _path(f):
+    name = getattr(getattr(f, 'file', f), 'name', None)
+    return name if isinstance(name, str) else None
+
+# Parses a csv in typed chunks with the chosen engine (CSV_ENGINE by
+# default): numeric columns as float64, categories as pandas categoricals,
+# timestamps as datetimes, the rest as strings. Engines that are not
+# installed, or cannot read this file, fall back to pandas' C parser.
+# Raises SchemaMismatch when the data stops matching the schema.
+def read_chunks(f, schema, chunk_rows, engine=None):
+    engine = engine or settings.CSV_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f'CSV engine must be one of {", ".join(ENGINES)}')
+    if engine == 'polars' and pl is not None and schema.encoding.startswith('utf') and _path(f):
+        return _polars_chunks(_path(f), schema, chunk_rows)
+    if engine == 'pyarrow':
+        return _arrow_chunks(f, schema, chunk_rows)
+    return _c_chunks(f, schema, chunk_rows)
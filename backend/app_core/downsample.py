@@ -0,0 +1,45 @@
+import numpy as np
+
+# Plot-ready downsampling. Both return indices into x/y so callers can keep
+# the original row positions.
+
+# min and max of each bucket, keeps spikes visible. Bucket edges come from
+# linspace so every bucket holds at least one point, shorter buckets are
+# padded with NaN up to the longest
+def minmax(y, n):
+    buckets = max(n // 2, 1)
+    if len(y) <= n:
+        return np.arange(len(y))
+    edges = np.linspace(0, len(y), buckets + 1).astype('int64')
+    pos = edges[:-1, None] + np.arange(np.diff(edges).max())
+    grid = np.where(pos < edges[1:, None], y[np.minimum(pos, len(y) - 1)], np.nan)
+    idx = np.concatenate([edges[:-1] + np.nanargmin(grid, axis=1), edges[:-1] + np.nanargmax(grid, axis=1)])
+    return np.unique(idx)
+
+# largest-triangle-three-buckets (Steinarsson 2013); the bucket loop is
+# inherently sequential, the work inside each bucket is vectorized
+def lttb(x, y, n):
+    if len(y) <= n or n < 3:
+        return np.arange(len(y))
+    edges = np.linspace(1, len(y) - 1, n - 1).astype('int64')
+    out = np.empty(n, dtype='int64')
+    out[0], out[-1] = 0, len(y) - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else len(y)
+        cx = x[hi:nxt_hi].mean()
+        cy = y[hi:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+METHODS = ('lttb', 'minmax')
+
+# drop NaNs, then downsample to at most n points
+def downsample(y, n, method='lttb'):
+    x = np.flatnonzero(~np.isnan(y))
+    y = y[x]
+    idx = lttb(x.astype('float64'), y, n) if method == 'lttb' else minmax(y, n)
+    return x[idx], y[idx]
@@ -0,0 +1,152 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from django.conf import settings
+
+from .csvparse import NUMERIC, SchemaMismatch, infer_schema, read_chunks
+from .metrics import span
+from .sketches import SketchSet
+from .stats import compute_statistics, streamed_statistics
+from .utils import NUMERIC_COLS, SummaryAccumulator
+
+SAMPLE_BYTES = 64 * 1024
+# rough in-memory size of a parsed row relative to its csv text
+MEMORY_FACTOR = 10
+MIN_CHUNK_ROWS = 1000
+# working memory per numeric value when statistics are computed exactly
+# (the float matrix plus the copies nanquantile and corr make)
+STATS_BYTES_PER_VALUE = 32
+
+class IngestError(Exception):
+    pass
+
+# pick a chunk size so one parsed chunk stays under the memory ceiling
+def chunk_rows_for(f, limit_mb=None):
+    limit = (limit_mb or settings.CSV_INGEST_MEMORY_MB) * 1024 * 1024
+    pos = f.tell()
+    sample = f.read(SAMPLE_BYTES)
+    f.seek(pos)
+    lines = max(sample.count(b'\n'), 1)
+    per_row = max(len(sample) / lines, 1) * MEMORY_FACTOR
+    return max(int(limit // per_row), MIN_CHUNK_ROWS)
+
+# categoricals are stored as plain strings, every chunk has its own dictionary
+def _storage_schema(schema):
+    return pa.schema([pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                      for f in schema])
+
+def _discard(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+# Infers the csv's schema from its head and hands write() typed chunks.
+# If a value further down does not fit (text in a numeric column), write()
+# runs again over the whole file: the known numeric columns coerce bad
+# values to NaN, other columns that turn out not to fit are read as text.
+def _parse(f, numeric, write, limit_mb=None, engine=None):
+    start = f.tell()
+    try:
+        chunk_rows = chunk_rows_for(f, limit_mb)
+        schema = infer_schema(f, numeric)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise IngestError(str(e)) from e
+    try:
+        return write(schema, read_chunks(f, schema, chunk_rows, engine))
+    except SchemaMismatch:
+        f.seek(start)
+    try:
+        schema = schema.loosened(f)
+        return write(schema, read_chunks(f, schema, chunk_rows, engine))
+    except (ValueError, pd.errors.ParserError) as e:
+        raise IngestError(str(e)) from e
+
+# Streams a csv in typed chunks, writing the Arrow cache and summing the
+# summary as it goes. Returns (summary, row_count, sketches); only one
+# chunk is held at a time.
+def ingest_csv(f, dest_path, limit_mb=None, progress=None, engine=None):
+    tmp_path = dest_path + '.tmp'
+
+    def write(schema, chunks):
+        numeric = schema.columns(NUMERIC)
+        acc, sketches, writer = SummaryAccumulator(), SketchSet(), None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    stored = _storage_schema(table.schema.remove_metadata())
+                    writer = pa.ipc.new_file(tmp_path, stored)
+                writer.write_table(table.cast(stored))
+                acc.add(chunk)
+                sketches.add(chunk, numeric)
+                if progress:
+                    progress(acc.rows, f.tell())
+        except SchemaMismatch:
+            if writer is not None:
+                writer.close()
+            _discard(tmp_path)
+            raise
+        except (ValueError, pd.errors.ParserError, pa.ArrowException) as e:
+            if writer is not None:
+                writer.close()
+            _discard(tmp_path)
+            raise IngestError(str(e)) from e
+        if writer is None:
+            raise IngestError('No columns to parse from file')
+        writer.close()
+        return numeric, stored, acc, sketches
+
+    numeric, schema, acc, sketches = _parse(f, NUMERIC_COLS, write, limit_mb, engine)
+    os.replace(tmp_path, dest_path)
+
+    stat_cols = numeric + (['Type'] if 'Type' in schema.names else [])
+    summary = acc.result()
+    with span('statistics'):
+        summary.update(_statistics(dest_path, stat_cols, acc.rows, sketches, limit_mb))
+    return summary, acc.rows, sketches.to_dict()
+
+# Second pass over the numeric columns, memory-mapped from the cache. Exact
+# when they fit under the ingest memory limit; past it the statistics are
+# built from the sketches, reading one record batch (one chunk) at a time.
+def _statistics(path, columns, rows, sketches, limit_mb=None):
+    categories = [c for c in columns if c == 'Type']
+    limit = (limit_mb or settings.CSV_INGEST_MEMORY_MB) * 1024 * 1024
+    if rows * len(columns) * STATS_BYTES_PER_VALUE <= limit:
+        frame = feather.read_table(path, columns=columns, memory_map=True).to_pandas(categories=categories)
+        return compute_statistics(frame)
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        frames = (reader.get_batch(i).select(columns).to_pandas(categories=categories)
+                  for i in range(reader.num_record_batches))
+        return streamed_statistics(frames, sketches)
+
+# Streams rows being appended to a dataset into an Arrow file of their own,
+# checked and cast against the dataset's schema. Returns the row count.
+def write_segment(f, schema, dest_path, limit_mb=None, engine=None):
+    tmp_path = dest_path + '.tmp'
+
+    def write(_, chunks):
+        rows = 0
+        try:
+            with pa.ipc.new_file(tmp_path, schema) as writer:
+                for chunk in chunks:
+                    if sorted(chunk.columns) != sorted(schema.names):
+                        raise IngestError(f'Columns must match the dataset: {", ".join(schema.names)}')
+                    table = pa.Table.from_pandas(chunk[schema.names], preserve_index=False)
+                    writer.write_table(table.cast(schema))
+                    rows += len(chunk)
+            if not rows:
+                raise IngestError('No rows to append')
+        except (IngestError, SchemaMismatch):
+            _discard(tmp_path)
+            raise
+        except (ValueError, pd.errors.ParserError, pa.ArrowException) as e:
+            _discard(tmp_path)
+            raise IngestError(str(e)) from e
+        return rows
+
+    numeric = [field.name for field in schema if pa.types.is_floating(field.type)]
+    rows = _parse(f, numeric, write, limit_mb, engine)
+    os.replace(tmp_path, dest_path)
+    return rows
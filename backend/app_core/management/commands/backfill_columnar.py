@@ -0,0 +1,41 @@
+import os
+from django.core.management.base import BaseCommand
+
+from app_core.catalog import materialize_stats
+from app_core.columnar import build_columnar, columnar_path
+from app_core.models import UploadedDataset
+from app_core.utils import file_sha256
+
+class Command(BaseCommand):
+    help = 'Write the columnar cache, sketches, content hash and stats tables for datasets uploaded before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild existing caches too')
+
+    def handle(self, *args, force=False, **opts):
+        done = 0
+        for ds in UploadedDataset.objects.all():
+            stale = (force or not ds.sketches or not ds.content_hash or 'columns' not in (ds.summary or {})
+                     or not os.path.exists(columnar_path(ds)))
+            if stale:
+                try:
+                    self.rebuild(ds)
+                    done += 1
+                except Exception as e:
+                    self.stderr.write(f'{ds.id} {ds.name}: {e}')
+                    continue
+            if stale or not ds.column_stats.exists():
+                materialize_stats(ds)
+        self.stdout.write(self.style.SUCCESS(f'Built {done} columnar caches'))
+
+    # rewrite the cache and, from the same pass, the summary and sketches;
+    # appended rows only live in the segments, so a dataset that has them
+    # keeps its stored summary and sketches, which already cover them
+    def rebuild(self, ds):
+        summary, _, sketches = build_columnar(ds)
+        if ds.segments:
+            return
+        with ds.csv_file.open('rb') as f:
+            ds.content_hash = file_sha256(f)
+        ds.summary, ds.sketches = summary, sketches
+        ds.save(update_fields=['summary', 'sketches', 'content_hash'])
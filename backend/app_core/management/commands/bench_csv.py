@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from app_core import csvparse
+from app_core.csvparse import ENGINES
+from app_core.ingest import ingest_csv
+from app_core.utils import NUMERIC_COLS, coerce_numeric, parse_csv_file
+
+# how uploads were parsed before the typed parser: object columns, then a
+# second to_numeric pass
+def legacy_parse(f):
+    df = pd.read_csv(f)
+    df.columns = df.columns.str.strip()
+    return coerce_numeric(df, NUMERIC_COLS)
+
+class Command(BaseCommand):
+    help = 'Time csv parsing and ingest per parser engine against the untyped pandas parse'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='csv file to parse')
+        parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+        parser.add_argument('--repeat', type=int, default=3, help='best of this many runs')
+
+    def _best(self, fn, repeat):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def handle(self, *args, path, engines, repeat, **opts):
+        def parse(engine):
+            with open(path, 'rb') as f:
+                return parse_csv_file(f, engine) if engine else legacy_parse(f)
+
+        def ingest(engine):
+            with open(path, 'rb') as f, tempfile.TemporaryDirectory() as tmp:
+                ingest_csv(f, os.path.join(tmp, 'bench.arrow'), engine=engine)
+
+        size = os.path.getsize(path) / 1e6
+        rows = len(parse('c'))
+        self.stdout.write(f'{path}: {rows} rows, {size:.1f} MB, best of {repeat}')
+        base = self._best(lambda: parse(None), repeat)
+        self.stdout.write(f'{"legacy read_csv + to_numeric":32} parse {base:7.3f}s')
+        for engine in engines:
+            if engine == 'polars' and csvparse.pl is None:
+                self.stdout.write(f'{engine:32} not installed')
+                continue
+            t = self._best(lambda: parse(engine), repeat)
+            ti = self._best(lambda: ingest(engine), repeat)
+            self.stdout.write(f'{engine:32} parse {t:7.3f}s ({base / t:4.1f}x)  ingest {ti:7.3f}s '
+                              f'({rows / ti / 1e6:.2f}M rows/s)')
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app_core import tasks
+from app_core.models import UploadedDataset
+from app_core.reports import remove_reports
+from app_core.utils import compute_summary, parse_csv_file
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+GEN_BLOCK = 500_000
+# a benchmark this much slower than the baseline is reported as a regression
+THRESHOLD = 1.25
+
+# Writes rows shaped like the sample csv: same columns, types in the same
+# proportions and readings drawn around each type's mean and spread
+def synthetic_csv(path, rows, sample, seed=0):
+    df = pd.read_csv(sample)
+    df.columns = df.columns.str.strip()
+    numeric = ['Flowrate', 'Pressure', 'Temperature']
+    by_type = df.groupby('Type')[numeric]
+    types = by_type.size()
+    mean = by_type.mean().loc[types.index].to_numpy()
+    # single-row types have no spread, give them 2% of their mean
+    std = by_type.std().loc[types.index].fillna(0).to_numpy()
+    std = np.maximum(std, np.abs(mean) * 0.02)
+    names = types.index.to_numpy()
+    rng = np.random.default_rng(seed)
+
+    with open(path, 'w', newline='') as out:
+        out.write('Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+        for start in range(0, rows, GEN_BLOCK):
+            n = min(GEN_BLOCK, rows - start)
+            t = rng.choice(len(names), size=n, p=types.to_numpy() / types.sum())
+            vals = rng.normal(mean[t], std[t]).round(2)
+            block = pd.DataFrame({
+                'Equipment Name': pd.Series(names[t]) + '-' + pd.Series(np.arange(start + 1, start + n + 1)).astype(str),
+                'Type': names[t],
+                **{c: vals[:, i] for i, c in enumerate(numeric)},
+            })
+            block.to_csv(out, header=False, index=False)
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def _check(resp):
+    if resp.status_code not in (200, 201, 202):
+        raise CommandError(f'{resp.request["PATH_INFO"]} returned {resp.status_code}')
+    return resp
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        took = time.perf_counter() - start
+        best = took if best is None or took < best else best
+    return best, out
+
+class Command(BaseCommand):
+    help = ('Benchmark parsing, summaries, upload, chart data and reports on synthetic csvs; '
+            'writes the results as JSON and compares them with an earlier run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1k,10k,100k,1m',
+                            help=f'comma separated, from {", ".join(SIZES)}')
+        parser.add_argument('--repeat', type=int, default=3, help='best of this many runs')
+        parser.add_argument('--output', help='JSON file to write (default bench_<commit>.json)')
+        parser.add_argument('--compare', help='earlier JSON result to compare against')
+        parser.add_argument('--sample', default=os.path.join(settings.BASE_DIR.parent, 'sample_equipment_data.csv'),
+                            help='csv whose shape the synthetic data follows')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, sizes, repeat, output, compare, sample, seed, **opts):
+        try:
+            rows = [SIZES[s.strip().lower()] for s in sizes.split(',')]
+        except KeyError as e:
+            raise CommandError(f'Unknown size {e}, use {", ".join(SIZES)}')
+        if not os.path.exists(sample):
+            raise CommandError(f'No sample csv at {sample}')
+        baseline = None
+        if compare:
+            with open(compare) as f:
+                baseline = json.load(f)
+
+        commit = _commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'pandas': pd.__version__,
+                'pyarrow': pa.__version__,
+                'database': connection.vendor,
+                'csv_engine': settings.CSV_ENGINE,
+                'repeat': repeat,
+                'seed': seed,
+            },
+            'results': [],
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(MEDIA_ROOT=os.path.join(tmp, 'media')):
+                self._run(tmp, rows, repeat, sample, seed, report['results'])
+
+        output = output or f'bench_{commit}.json'
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output}'))
+        if baseline:
+            self._compare(baseline, report)
+
+    # throwaway database and media root, so a run never touches real data
+    def _run(self, tmp, rows, repeat, sample, seed, results):
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        # keep the per-request log lines out of the report
+        logging.getLogger('app_core.requests').setLevel(logging.WARNING)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User.objects.create_user('bench', password='bench')
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+            for n in rows:
+                path = os.path.join(tmp, f'equipment_{n}.csv')
+                self.stdout.write(f'{n} rows: generating')
+                synthetic_csv(path, n, sample, seed)
+                for name, extra in self._measure(client, path, n, repeat):
+                    results.append({'name': name, 'rows': n, **extra})
+                    self.stdout.write(f'  {name:20} {extra["seconds"] * 1000:10.1f} ms'
+                                      + (f'  {extra["bytes"]} bytes' if 'bytes' in extra else ''))
+                os.remove(path)
+        finally:
+            tasks.shutdown_executor()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def _measure(self, client, path, n, repeat):
+        def parse():
+            with open(path, 'rb') as f:
+                return parse_csv_file(f)
+        took, df = _best(parse, repeat)
+        yield 'parse_csv_file', {'seconds': took, 'rows_per_second': n / took}
+
+        took, _ = _best(lambda d=df: compute_summary(d.copy()), repeat)
+        yield 'compute_summary', {'seconds': took, 'rows_per_second': n / took}
+        del df
+
+        # POST until the job is done; the dataset is deleted between runs so
+        # the upload is not deduplicated
+        def upload():
+            with open(path, 'rb') as f:
+                job = _check(client.post('/api/upload/', {'file': f})).json()
+            while job['status'] not in ('done', 'failed'):
+                time.sleep(0.01)
+                job = client.get(f'/api/jobs/{job["id"]}/').json()
+            if job['status'] == 'failed':
+                raise CommandError(f'Upload failed: {job["error"]}')
+            return job['dataset']['id']
+        times = []
+        for i in range(repeat):
+            took, did = _best(upload, 1)
+            times.append(took)
+            if i < repeat - 1:
+                client.delete(f'/api/delete/{did}/')
+        yield 'upload', {'seconds': min(times), 'rows_per_second': n / min(times),
+                         'bytes': os.path.getsize(path)}
+
+        def duplicate():
+            with open(path, 'rb') as f:
+                return client.post('/api/upload/', {'file': f})
+        took, _ = _best(duplicate, repeat)
+        yield 'upload_duplicate', {'seconds': took}
+
+        took, resp = _best(lambda: client.get(f'/api/chart-data/?id={did}'), repeat)
+        _check(resp)
+        yield 'chart_data', {'seconds': took, 'bytes': len(resp.content)}
+
+        # wait out the pre-render queued by the upload, then time an inline render
+        tasks.shutdown_executor()
+        def report():
+            remove_reports(UploadedDataset.objects.get(id=did))
+            resp = client.get(f'/api/report/?id={did}')
+            _check(resp)
+            size = sum(len(part) for part in resp.streaming_content)
+            resp.close()
+            return size
+        took, size = _best(report, repeat)
+        yield 'report', {'seconds': took, 'bytes': size}
+
+    def _compare(self, baseline, report):
+        old = {(r['name'], r['rows']): r['seconds'] for r in baseline['results']}
+        self.stdout.write(f'Compared with {baseline["meta"]["commit"]}:')
+        regressions = 0
+        for r in report['results']:
+            before = old.get((r['name'], r['rows']))
+            if before is None:
+                continue
+            ratio = r['seconds'] / before
+            slow = ratio > THRESHOLD
+            regressions += slow
+            line = f'  {r["name"]:20} {r["rows"]:>10} rows  {ratio:5.2f}x'
+            self.stdout.write(self.style.ERROR(line + '  slower') if slow else line)
+        if regressions:
+            raise CommandError(f'{regressions} regressions over {THRESHOLD}x')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from app_core.tasks import cleanup_uploads, fail_interrupted_jobs
+
+class Command(BaseCommand):
+    help = 'Delete old upload jobs and abandoned resumable uploads; fail jobs a restart interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interrupted', action='store_true',
+                            help='Also fail queued and running jobs. Only while no server is running')
+
+    def handle(self, *args, interrupted=False, **opts):
+        if interrupted:
+            self.stdout.write(f'Failed {fail_interrupted_jobs()} interrupted jobs')
+        jobs, sessions = cleanup_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Removed {jobs} old jobs and {sessions} abandoned uploads'))
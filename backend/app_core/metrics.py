@@ -0,0 +1,118 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# spans of the request being served, None outside one (worker threads)
+_spans = ContextVar('spans', default=None)
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = dict(self._values)
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labels, key)} {_num(value)}'
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._values = {}  # labels -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            counts = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def lines(self):
+        with self._lock:
+            values = {k: list(v) for k, v in self._values.items()}
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        for key, counts in sorted(values.items()):
+            for bound, n in zip(self.buckets + (math.inf,), counts[:-2] + [counts[-2]]):
+                le = _labels(self.labels + ('le',), key + ('+Inf' if bound == math.inf else _num(bound),))
+                yield f'{self.name}_bucket{le} {n}'
+            yield f'{self.name}_count{_labels(self.labels, key)} {counts[-2]}'
+            yield f'{self.name}_sum{_labels(self.labels, key)} {_num(counts[-1])}'
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+def _labels(names, values):
+    if not names:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+REQUESTS = Counter('http_requests_total', 'Requests served', ('view', 'method', 'status'))
+LATENCY = Histogram('http_request_duration_seconds', 'Time to serve a request', ('view', 'method'))
+BYTES_IN = Counter('http_request_bytes_total', 'Request body bytes received', ('view',))
+BYTES_OUT = Counter('http_response_bytes_total', 'Response body bytes sent', ('view',))
+SPANS = Histogram('app_span_duration_seconds', 'Time spent in one step of a request or background job',
+                  ('view', 'span'))
+ROWS = Counter('app_rows_processed_total', 'Csv rows parsed into datasets', ('source',))
+METRICS = [REQUESTS, LATENCY, BYTES_IN, BYTES_OUT, SPANS, ROWS]
+
+# Prometheus text exposition of everything this process has counted
+def render():
+    return '\n'.join(line for metric in METRICS for line in metric.lines()) + '\n'
+
+# Starts collecting spans for one request; returns the list they land in
+def start_request():
+    spans = []
+    _spans.set(spans)
+    return spans
+
+def end_request():
+    _spans.set(None)
+
+# Times a step, e.g. `with span('parse'):`. Inside a request the step is
+# kept for the middleware, which puts it in the Server-Timing header, the
+# log line and app_span_duration_seconds; outside one (worker threads) it
+# goes straight to the histogram under view="worker".
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def record(name, seconds):
+    spans = _spans.get()
+    if spans is None:
+        SPANS.observe(seconds, view='worker', span=name)
+    else:
+        spans.append((name, seconds))
+
+def rows_processed(n, source):
+    ROWS.inc(n, source=source)
+
+# Server-Timing value; repeated spans are summed
+def server_timing(spans, total):
+    merged = {}
+    for name, seconds in spans:
+        merged[name] = merged.get(name, 0) + seconds
+    parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in merged.items()]
+    return ', '.join(parts + [f'total;dur={total * 1000:.1f}'])
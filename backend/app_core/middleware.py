@@ -0,0 +1,170 @@
+import cProfile
+import gzip
+import io
+import json
+import logging
+import pstats
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import metrics
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip covers every client
+    zstandard = None
+
+try:
+    import pyinstrument
+except ImportError:  # sampling profiler is optional, cProfile is the fallback
+    pyinstrument = None
+
+request_log = logging.getLogger('app_core.requests')
+
+# bodies smaller than this are not worth the header overhead
+MIN_COMPRESS_BYTES = 512
+# data payloads only: HTML pages carry CSRF tokens and compressing them
+# next to reflected input would open them to BREACH
+COMPRESSIBLE_TYPES = ('application/json', 'application/vnd.apache.arrow.stream', 'application/msgpack')
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# functions listed in a cProfile report
+PROFILE_LINES = 60
+
+def _accepted_codings(request):
+    codings = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            codings.add(name.strip().lower())
+    return codings
+
+def _compress(body, coding):
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+# Compresses API bodies with zstd or gzip, whichever the client accepts (zstd
+# first). Like Django's GZipMiddleware it leaves streamed and small bodies
+# alone and weakens the ETag, since the bytes on the wire depend on the
+# coding.
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '')
+        if (response.streaming or response.status_code != 200 or response.has_header('Content-Encoding')
+                or not content_type.startswith(COMPRESSIBLE_TYPES) or settings.CSRF_COOKIE_NAME in response.cookies):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < MIN_COMPRESS_BYTES:
+            return response
+
+        accepted = _accepted_codings(request)
+        coding = 'zstd' if zstandard and 'zstd' in accepted else 'gzip' if 'gzip' in accepted else None
+        if coding is None:
+            return response
+        compressed = _compress(response.content, coding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+# Times every request. Spans recorded by the view (metrics.span) and the JSON
+# render go into a Server-Timing header and a one-line JSON log on
+# app_core.requests; latency, bytes in/out and span times feed the /metrics
+# counters. Sits above CompressionMiddleware so bytes out are what went on the
+# wire.
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        spans = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request()
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        bytes_in = int(request.META.get('CONTENT_LENGTH') or 0)
+        bytes_out = int(response.get('Content-Length') or 0) if response.streaming else len(response.content)
+        metrics.REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        metrics.LATENCY.observe(total, view=view, method=request.method)
+        metrics.BYTES_IN.inc(bytes_in, view=view)
+        metrics.BYTES_OUT.inc(bytes_out, view=view)
+        for name, seconds in spans:
+            metrics.SPANS.observe(seconds, view=view, span=name)
+        response['Server-Timing'] = metrics.server_timing(spans, total)
+
+        user = getattr(request, 'user', None)
+        request_log.info(json.dumps({
+            'method': request.method, 'path': request.path, 'view': view,
+            'status': response.status_code, 'ms': round(total * 1000, 1),
+            'bytes_in': bytes_in, 'bytes_out': bytes_out,
+            'user': user.pk if user is not None and user.is_authenticated else None,
+            'spans': {name: round(seconds * 1000, 1) for name, seconds in spans},
+        }))
+        return response
+
+    # DRF responses render after the view returns, time that as well
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+        response.add_post_render_callback(lambda r: metrics.record('render', time.perf_counter() - start))
+        return response
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            found = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            found = None
+        user = found[0] if found else None
+    return bool(user and user.is_staff)
+
+def _profile(get_response, request):
+    if pyinstrument is not None:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            get_response(request).close()
+        finally:
+            profiler.stop()
+        return profiler.output_text(unicode=True)
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(lambda: get_response(request).close())
+    finally:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+# Staff users (session or token) can send "X-Profile: 1" to get a profile of
+# the request back instead of its response: pyinstrument's sampled call tree
+# if it is installed, otherwise cProfile's top functions by cumulative time.
+# Only on when PROFILE_REQUESTS=1.
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.PROFILE_REQUESTS and request.META.get('HTTP_X_PROFILE') == '1' and _is_staff(request)):
+            return self.get_response(request)
+        return HttpResponse(_profile(self.get_response, request), content_type='text/plain; charset=utf-8')
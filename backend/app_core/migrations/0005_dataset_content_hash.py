@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_core', '0004_dataset_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddataset',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+METRICS = ('count', 'nulls', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99')
+
+
+# copy stats of existing datasets out of their summary JSON
+def fill_stats(apps, schema_editor):
+    Dataset = apps.get_model('app_core', 'UploadedDataset')
+    ColumnStat = apps.get_model('app_core', 'DatasetColumnStat')
+    TypeCount = apps.get_model('app_core', 'DatasetTypeCount')
+    for ds in Dataset.objects.all():
+        summary = ds.summary or {}
+        ColumnStat.objects.bulk_create([
+            ColumnStat(dataset=ds, column=col, metric=m, value=vals.get(m))
+            for col, vals in summary.get('columns', {}).items() for m in METRICS
+        ])
+        TypeCount.objects.bulk_create([
+            TypeCount(dataset=ds, type=t, count=n)
+            for t, n in summary.get('type_distribution', {}).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_core', '0005_dataset_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetColumnStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('column', models.CharField(max_length=255)),
+                ('metric', models.CharField(max_length=10)),
+                ('value', models.FloatField(null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='column_stats', to='app_core.uploadeddataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['column', 'metric', 'value'], name='column_metric_value')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'column', 'metric'), name='unique_dataset_column_metric')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DatasetTypeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=255)),
+                ('count', models.IntegerField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_counts', to='app_core.uploadeddataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['type', 'count'], name='type_count')],
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'type'), name='unique_dataset_type')],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_core', '0007_upload_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddataset',
+            name='segments',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadeddataset',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
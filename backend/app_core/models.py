@@ -1,3 +1,6 @@
+import os
+
+from django.conf import settings
 from django.db import models
 
 class UploadedDataset(models.Model):
@@ -5,10 +8,96 @@ class UploadedDataset(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     csv_file = models.FileField(upload_to='datasets/')
     summary = models.JSONField(default=dict, blank=True)
+    # mergeable sketch state, kept out of the summary clients download
+    sketches = models.JSONField(default=dict, blank=True)
     row_count = models.IntegerField(default=0)
+    # sha256 of the csv; datasets with equal hashes share one stored file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Arrow segments holding rows appended after the upload
+    segments = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-uploaded_at']
 
     def __str__(self):
         return f"{self.name} ({self.uploaded_at:%Y-%m-%d})"
+
+class UploadJob(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=255)
+    csv_file = models.FileField(upload_to='datasets/')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows_processed = models.IntegerField(default=0)
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    dataset = models.ForeignKey(UploadedDataset, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.bytes_total:
+            return 0
+        return min(99, int(self.bytes_processed * 100 / self.bytes_total))
+
+    def __str__(self):
+        return f"{self.name} [{self.status}]"
+
+class UploadSession(models.Model):
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    received = models.BigIntegerField(default=0)
+    next_chunk = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', f'{self.id}.part')
+
+    @property
+    def complete(self):
+        return self.received == self.size
+
+    def __str__(self):
+        return f"{self.name} ({self.received}/{self.size})"
+
+# Per-column stats copied out of the summary JSON so cross-dataset filters
+# ("mean Pressure > 7") run as indexed queries. One row per metric.
+class DatasetColumnStat(models.Model):
+    METRICS = ('count', 'nulls', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99')
+
+    dataset = models.ForeignKey(UploadedDataset, on_delete=models.CASCADE, related_name='column_stats')
+    column = models.CharField(max_length=255)
+    metric = models.CharField(max_length=10)
+    value = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['dataset', 'column', 'metric'],
+                                               name='unique_dataset_column_metric')]
+        indexes = [models.Index(fields=['column', 'metric', 'value'], name='column_metric_value')]
+
+    def __str__(self):
+        return f"{self.dataset_id} {self.column}.{self.metric}={self.value}"
+
+class DatasetTypeCount(models.Model):
+    dataset = models.ForeignKey(UploadedDataset, on_delete=models.CASCADE, related_name='type_counts')
+    type = models.CharField(max_length=255)
+    count = models.IntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['dataset', 'type'], name='unique_dataset_type')]
+        indexes = [models.Index(fields=['type', 'count'], name='type_count')]
+
+    def __str__(self):
+        return f"{self.dataset_id} {self.type}={self.count}"
@@ -0,0 +1,38 @@
+import pyarrow as pa
+from rest_framework.pagination import LimitOffsetPagination
+
+# rows of a dataframe or an Arrow table as a dataframe; a table is only
+# converted for the rows asked for
+def _rows(data, key):
+    if isinstance(data, pa.Table):
+        start, stop, _ = key.indices(data.num_rows)
+        return data.slice(start, max(stop - start, 0)).to_pandas()
+    return data.iloc[key]
+
+class RowPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+    # same limit/offset handling, but the page stays a dataframe so
+    # binary renderers can send it column by column
+    def paginate_frame(self, df, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.count = len(df)
+        return _rows(df, slice(self.offset, self.offset + self.limit))
+
+# lets DRF paginators slice a dataframe or Arrow table without materialising
+# every row
+class FrameRecords:
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, key):
+        page = _rows(self.df, key)
+        # NaN is not valid JSON
+        page = page.astype(object).where(page.notna(), None)
+        return page.to_dict(orient='records')
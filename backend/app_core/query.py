@@ -0,0 +1,163 @@
+import hashlib
+import json
+
+import pandas as pd
+import pyarrow as pa
+
+from .utils import query_rows
+
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'std', 'median', 'nunique')
+# these need a numeric column
+NUMERIC_AGGREGATES = ('sum', 'mean', 'std', 'median')
+OPS = ('==', '!=', '>', '>=', '<', '<=')
+SPEC_KEYS = {'id', 'filters', 'group_by', 'aggregates', 'pivot', 'sort', 'limit'}
+MAX_GROUP_KEYS = 3
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+def _column(name, schema, what):
+    if not isinstance(name, str) or name not in schema.names:
+        raise ValueError(f'Unknown column in {what}: {name}')
+    return name
+
+def _list(spec, key):
+    value = spec.get(key, [])
+    if not isinstance(value, list):
+        raise ValueError(f'{key} must be a list')
+    return value
+
+# a filter value has to fit its column: numbers for numeric columns, dates
+# for timestamps, strings for text
+def _filter_value(value, typ, col):
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        raise ValueError('Filter values must be strings or numbers')
+    if pa.types.is_floating(typ) or pa.types.is_integer(typ):
+        if isinstance(value, str):
+            raise ValueError(f'{col} expects a number')
+    elif pa.types.is_timestamp(typ) or pa.types.is_date(typ):
+        try:
+            if not isinstance(value, str) or pd.isna(pd.Timestamp(value)):
+                raise ValueError
+        except ValueError:
+            raise ValueError(f'{col} expects a date')
+    elif not isinstance(value, str):
+        raise ValueError(f'{col} expects a string')
+    return value
+
+def agg_name(column, fn):
+    return fn if column == '*' else f'{fn}_{column}'
+
+# Checks a query spec against the dataset's Arrow schema and returns it in
+# canonical form, so equal queries hash the same. Raises ValueError.
+#   {"filters": [{"column": "Pressure", "op": ">", "value": 5}],
+#    "group_by": ["Type"], "aggregates": [{"column": "Temperature", "fn": "mean"}],
+#    "pivot": null, "sort": ["-mean_Temperature"], "limit": 100}
+def parse_query(spec, schema):
+    if not isinstance(spec, dict):
+        raise ValueError('Query must be a JSON object')
+    unknown = set(spec) - SPEC_KEYS
+    if unknown:
+        raise ValueError(f'Unknown query keys: {", ".join(sorted(unknown))}')
+
+    filters = []
+    for f in _list(spec, 'filters'):
+        if not isinstance(f, dict) or set(f) != {'column', 'op', 'value'}:
+            raise ValueError('Each filter needs exactly column, op and value')
+        if f['op'] not in OPS:
+            raise ValueError(f'op must be one of {" ".join(OPS)}')
+        col = _column(f['column'], schema, 'filters')
+        filters.append([col, f['op'], _filter_value(f['value'], schema.field(col).type, col)])
+
+    group_by = [_column(c, schema, 'group_by') for c in _list(spec, 'group_by')]
+    if len(group_by) > MAX_GROUP_KEYS or len(set(group_by)) != len(group_by):
+        raise ValueError(f'group_by takes up to {MAX_GROUP_KEYS} distinct columns')
+
+    aggregates = []
+    for a in _list(spec, 'aggregates') or [{'column': '*', 'fn': 'count'}]:
+        if not isinstance(a, dict) or set(a) != {'column', 'fn'}:
+            raise ValueError('Each aggregate needs exactly column and fn')
+        if a['fn'] not in AGGREGATES:
+            raise ValueError(f'fn must be one of {", ".join(AGGREGATES)}')
+        if a['column'] == '*':
+            if a['fn'] != 'count':
+                raise ValueError('Only count can use column "*"')
+        else:
+            col = _column(a['column'], schema, 'aggregates')
+            typ = schema.field(col).type
+            if a['fn'] in NUMERIC_AGGREGATES and not (pa.types.is_floating(typ) or pa.types.is_integer(typ)):
+                raise ValueError(f'{a["fn"]} needs a numeric column, {col} is not')
+        aggregates.append([a['column'], a['fn']])
+    names = [agg_name(c, fn) for c, fn in aggregates]
+    if len(set(names)) != len(names):
+        raise ValueError('Duplicate aggregate')
+
+    pivot = spec.get('pivot')
+    if pivot is not None:
+        _column(pivot, schema, 'pivot')
+        if pivot in group_by:
+            raise ValueError('pivot column cannot also be in group_by')
+        if len(aggregates) != 1:
+            raise ValueError('pivot needs exactly one aggregate')
+
+    sort = _list(spec, 'sort')
+    # a pivot's value columns depend on the data, so it sorts by group keys only
+    sortable = group_by + ([] if pivot else names)
+    for s in sort:
+        if not isinstance(s, str) or s.lstrip('-') not in sortable:
+            raise ValueError(f'sort must name a group_by column{"" if pivot else " or an aggregate"}: {s}')
+
+    limit = spec.get('limit', DEFAULT_LIMIT)
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit must be an integer from 1 to {MAX_LIMIT}')
+
+    return {'filters': filters, 'group_by': group_by, 'aggregates': aggregates,
+            'pivot': pivot, 'sort': sort, 'limit': limit}
+
+def query_key(ds, query):
+    digest = hashlib.sha256(json.dumps(query, sort_keys=True).encode()).hexdigest()
+    return f'query:{ds.id}:{ds.content_hash or ds.uploaded_at.isoformat()}:{digest}'
+
+# columns a parsed query reads from the cache
+def query_columns(query):
+    cols = [f[0] for f in query['filters']] + query['group_by'] + [c for c, _ in query['aggregates']]
+    if query['pivot']:
+        cols.append(query['pivot'])
+    return list(dict.fromkeys(c for c in cols if c != '*'))
+
+def _records(df):
+    df = df.astype(object).where(df.notna(), None)
+    return {'columns': [str(c) for c in df.columns], 'rows': df.values.tolist()}
+
+# runs a parsed query over a dataframe with pandas groupby, returns
+# {'columns': [...], 'rows': [[...]], 'total': groups before the limit}
+def run_query(df, query):
+    df = query_rows(df, filters=[tuple(f) for f in query['filters']])
+    # rows without a pivot value have no column to land in
+    if query['pivot']:
+        df = df[df[query['pivot']].notna()]
+    keys = query['group_by'] + ([query['pivot']] if query['pivot'] else [])
+    if keys:
+        # count(*) is the group size, taken off any key column
+        aggs = {agg_name(c, fn): pd.NamedAgg(column=keys[0] if c == '*' else c,
+                                             aggfunc='size' if c == '*' else fn)
+                for c, fn in query['aggregates']}
+        out = df.groupby(keys, observed=True, dropna=False, sort=True).agg(**aggs).reset_index()
+    else:
+        out = pd.DataFrame([{agg_name(c, fn): len(df) if c == '*' else df[c].agg(fn)
+                             for c, fn in query['aggregates']}])
+
+    if query['pivot']:
+        value = agg_name(*query['aggregates'][0])
+        if query['group_by']:
+            out = out.pivot(index=query['group_by'], columns=query['pivot'], values=value).reset_index()
+        else:
+            out = out.set_index(query['pivot'])[[value]].T.reset_index(drop=True)
+        out.columns = [str(c) for c in out.columns]
+
+    if query['sort']:
+        out = out.sort_values([s.lstrip('-') for s in query['sort']],
+                              ascending=[not s.startswith('-') for s in query['sort']], kind='stable')
+    total = len(out)
+    result = _records(out.head(query['limit']))
+    result['total'] = total
+    return result
@@ -0,0 +1,65 @@
+import json
+
+import msgpack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+
+BINARY_FORMATS = ('arrow', 'msgpack')
+
+# Binary payloads carry their table as a DataFrame under 'results'; every
+# other key is sent alongside it as plain metadata.
+def _split(data):
+    data = dict(data or {})
+    frame = data.pop('results', None)
+    if not isinstance(frame, pd.DataFrame):
+        if frame is not None:
+            data['results'] = frame
+        frame = pd.DataFrame()
+    return frame, data
+
+# Arrow IPC stream: the table's columns as-is, metadata as JSON in the schema
+# under b'meta'.
+class ArrowStreamRenderer(BaseRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        frame, meta = _split(data)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({b'meta': json.dumps(meta, default=str).encode()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+# numeric columns go out as raw little-endian bytes plus their dtype,
+# anything else as a plain list
+def _pack_column(col):
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        arr = col.to_numpy(dtype='float64', na_value=np.nan) if col.hasnans else col.to_numpy()
+        arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+        return {'dtype': arr.dtype.str, 'data': arr.tobytes()}
+    return col.astype(object).where(col.notna(), None).tolist()
+
+# MessagePack: metadata as a map, 'results' as {column: packed column}.
+class MsgPackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        frame, meta = _split(data)
+        meta['results'] = {str(c): _pack_column(frame[c]) for c in frame.columns}
+        return msgpack.packb(meta, default=str)
+
+# renderers for endpoints that return table data
+DATA_RENDERERS = [JSONRenderer, BrowsableAPIRenderer, ArrowStreamRenderer, MsgPackRenderer]
+
+def wants_binary(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format in BINARY_FORMATS
@@ -0,0 +1,211 @@
+import glob
+import os
+import threading
+
+from django.conf import settings
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable, PageBreak
+)
+from reportlab.lib.styles import getSampleStyleSheet
+
+from .columnar import load_table
+
+# bump when the layout below changes, older cached PDFs are then re-rendered
+REPORT_TEMPLATE_VERSION = 3
+
+# data table rows are fixed height so a page's row count is known up front
+ROW_HEIGHT = 12
+TABLE_FONT_SIZE = 7
+CHART_SIZE = (6 * inch, 2.2 * inch)
+
+_render_lock = threading.Lock()
+
+def report_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'reports')
+
+def report_path(ds, full=False):
+    suffix = '.full' if full else ''
+    return os.path.join(report_dir(), f'report_{ds.id}.v{REPORT_TEMPLATE_VERSION}{suffix}.pdf')
+
+def _cell(v):
+    if v is None:
+        return ''
+    return f'{v:g}' if isinstance(v, float) else str(v)
+
+# Dataset rows, laid out one page at a time. The flowable never fits, so
+# ReportLab keeps asking it to split; each split slices the next page of rows
+# from the memory-mapped Arrow table and returns a Table for just those rows
+# plus the remainder. Only one page of cells is ever materialised.
+class DataTable(Flowable):
+    def __init__(self, table, style, offset=0):
+        super().__init__()
+        self.table = table
+        self.style = style
+        self.offset = offset
+
+    def wrap(self, avail_w, avail_h):
+        done = self.offset >= self.table.num_rows
+        return avail_w, 0 if done else avail_h + 1
+
+    def split(self, avail_w, avail_h):
+        n = int(avail_h // ROW_HEIGHT) - 1
+        if n < 1:
+            return []
+        page = self.table.slice(self.offset, n).to_pylist()
+        if not page:
+            return []
+        cols = self.table.column_names
+        data = [cols] + [[_cell(row[c]) for c in cols] for row in page]
+        t = Table(data, colWidths=[avail_w / len(cols)] * len(cols),
+                  rowHeights=ROW_HEIGHT, repeatRows=1)
+        t.setStyle(self.style)
+        return [t, DataTable(self.table, self.style, self.offset + n)]
+
+    def draw(self):
+        pass
+
+def _bar_chart(title, labels, values):
+    w, h = CHART_SIZE
+    d = Drawing(w, h)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 30, 30
+    chart.width, chart.height = w - 50, h - 50
+    chart.data = [list(values)]
+    chart.categoryAxis.categoryNames = [str(l) for l in labels]
+    chart.categoryAxis.labels.fontSize = 6
+    chart.valueAxis.labels.fontSize = 6
+    chart.valueAxis.valueMin = 0
+    chart.bars[0].fillColor = colors.HexColor('#3b82f6')
+    chart.bars.strokeColor = None
+    d.add(chart)
+    d.add(String(w / 2, h - 12, title, textAnchor='middle', fontSize=9))
+    return d
+
+# charts drawn from the stored summary, no row data is read
+def _charts(ds):
+    out = []
+    dist = ds.summary.get('type_distribution', {})
+    if dist:
+        out.append(_bar_chart('Type Distribution', dist.keys(), dist.values()))
+    for col, st in ds.summary.get('columns', {}).items():
+        hist = st.get('histogram') or {}
+        if hist.get('counts'):
+            labels = [_cell(e) for e in hist['edges'][:-1]]
+            out.append(_bar_chart(f'{col} Histogram', labels, hist['counts']))
+    return out
+
+def _full_sections(ds, styles, tbl_style):
+    els = [PageBreak(), Paragraph("Charts", styles['Heading2'])]
+    for chart in _charts(ds):
+        els.append(chart)
+        els.append(Spacer(1, 0.2 * inch))
+
+    by_type = ds.summary.get('by_type', {})
+    if by_type:
+        els.append(Paragraph("Averages by Type", styles['Heading2']))
+        cols = list(next(iter(by_type.values())).keys())
+        data = [['Type'] + cols] + [[t] + [_cell(v[c]['mean']) for c in cols]
+                                    for t, v in by_type.items()]
+        t = Table(data)
+        t.setStyle(tbl_style)
+        els.append(t)
+
+    table = load_table(ds)
+    data_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), TABLE_FONT_SIZE),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+    els += [PageBreak(), Paragraph("Data", styles['Heading2']), DataTable(table, data_style)]
+    return els
+
+# ReportLab document for one dataset, built from the stored summary.
+# The full report adds charts, per-Type averages and every data row.
+def build_report(ds, out, full=False):
+    doc = SimpleDocTemplate(out, pagesize=A4, pageCompression=1)
+    styles = getSampleStyleSheet()
+    els = []
+
+    els.append(Paragraph("Equipment Data Report", styles['Title']))
+    els.append(Spacer(1, 0.3 * inch))
+    els.append(Paragraph(f"File: {ds.name}", styles['Normal']))
+    els.append(Paragraph(f"Uploaded: {ds.uploaded_at:%Y-%m-%d %H:%M}", styles['Normal']))
+    els.append(Paragraph(f"Rows: {ds.row_count}", styles['Normal']))
+    els.append(Spacer(1, 0.3 * inch))
+
+    tbl_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ])
+
+    avgs = ds.summary.get('averages', {})
+    if avgs:
+        els.append(Paragraph("Parameter Averages", styles['Heading2']))
+        data = [['Parameter', 'Average']] + [[k, str(v)] for k, v in avgs.items()]
+        t = Table(data, colWidths=[2.5 * inch, 2 * inch])
+        t.setStyle(tbl_style)
+        els.append(t)
+        els.append(Spacer(1, 0.3 * inch))
+
+    col_stats = ds.summary.get('columns', {})
+    if col_stats:
+        els.append(Paragraph("Column Statistics", styles['Heading2']))
+        keys = ['min', 'max', 'mean', 'std', 'p50', 'p95', 'p99', 'nulls']
+        data = [['Column'] + [k.upper() if k.startswith('p') else k.title() for k in keys]]
+        data += [[c] + [str(st.get(k)) for k in keys] for c, st in col_stats.items()]
+        t = Table(data)
+        t.setStyle(tbl_style)
+        els.append(t)
+        els.append(Spacer(1, 0.3 * inch))
+
+    dist = ds.summary.get('type_distribution', {})
+    if dist:
+        els.append(Paragraph("Type Distribution", styles['Heading2']))
+        data = [['Type', 'Count']] + [[k, str(v)] for k, v in dist.items()]
+        t = Table(data, colWidths=[2.5 * inch, 2 * inch])
+        t.setStyle(tbl_style)
+        els.append(t)
+
+    if full:
+        els += _full_sections(ds, styles, tbl_style)
+    doc.build(els)
+
+# render to a temp file and swap it in, then drop other template versions
+def render_report(ds, full=False):
+    path = report_path(ds, full)
+    os.makedirs(report_dir(), exist_ok=True)
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        build_report(ds, tmp, full)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    remove_reports(ds, keep_version=REPORT_TEMPLATE_VERSION)
+    return path
+
+# cached PDF path, rendering it now if the background render has not run
+def ensure_report(ds, full=False):
+    path = report_path(ds, full)
+    if not os.path.exists(path):
+        with _render_lock:
+            if not os.path.exists(path):
+                render_report(ds, full)
+    return path
+
+def remove_reports(ds, keep_version=None):
+    keep = f'.v{keep_version}.' if keep_version else None
+    for p in glob.glob(os.path.join(report_dir(), f'report_{ds.id}.v*.pdf')):
+        if not keep or keep not in os.path.basename(p):
+            os.remove(p)
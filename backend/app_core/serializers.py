@@ -1,7 +1,25 @@
 from rest_framework import serializers
-from .models import UploadedDataset
+from .models import UploadedDataset, UploadJob, UploadSession
 
 class DatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedDataset
         fields = ['id', 'name', 'uploaded_at', 'row_count', 'summary']
+
+# dataset without its summary blob, for list endpoints
+class DatasetBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadedDataset
+        fields = ['id', 'name', 'uploaded_at', 'row_count']
+
+class JobSerializer(serializers.ModelSerializer):
+    dataset = DatasetSerializer(read_only=True)
+
+    class Meta:
+        model = UploadJob
+        fields = ['id', 'name', 'status', 'progress', 'rows_processed', 'error', 'dataset']
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'name', 'size', 'chunk_size', 'received', 'next_chunk']
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .columnar import remove_columnar, remove_segments
+from .models import UploadedDataset
+from .reports import remove_reports
+
+# Drop a dataset's files when it goes away. Duplicate uploads share one csv
+# and columnar cache, those are only removed with the last dataset using them;
+# appended segments belong to one dataset.
+@receiver(post_delete, sender=UploadedDataset)
+def remove_derived_files(sender, instance, **kwargs):
+    remove_reports(instance)
+    remove_segments(instance)
+    if instance.csv_file and not UploadedDataset.objects.filter(csv_file=instance.csv_file.name).exists():
+        remove_columnar(instance)
+        instance.csv_file.delete(save=False)
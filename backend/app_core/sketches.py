@@ -0,0 +1,251 @@
+import base64
+import math
+
+import numpy as np
+import pandas as pd
+
+# Mergeable summaries. Each one can be built chunk by chunk, stored as a
+# small json dict and merged with the same sketch from another dataset.
+
+# Count/mean/variance via Welford, merged with Chan's formula.
+class Moments:
+    def __init__(self, n=0, mean=0.0, m2=0.0, lo=math.inf, hi=-math.inf):
+        self.n, self.mean, self.m2, self.lo, self.hi = n, mean, m2, lo, hi
+
+    def add(self, values):
+        vals = values[~np.isnan(values)]
+        if len(vals):
+            mean = float(vals.mean())
+            m2 = float(((vals - mean) ** 2).sum())
+            self.merge(Moments(len(vals), mean, m2, float(vals.min()), float(vals.max())))
+
+    def merge(self, other):
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.lo, self.hi = min(self.lo, other.lo), max(self.hi, other.hi)
+        return self
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2,
+                'min': self.lo if self.n else None, 'max': self.hi if self.n else None}
+
+    @classmethod
+    def from_dict(cls, d):
+        if not d['n']:
+            return cls()
+        return cls(d['n'], d['mean'], d['m2'], d['min'], d['max'])
+
+
+# Merging t-digest with the k1 scale function, compressed with numpy.
+class TDigest:
+    def __init__(self, delta=200, means=None, weights=None):
+        self.delta = delta
+        self.means = np.asarray(means if means is not None else [], dtype='float64')
+        self.weights = np.asarray(weights if weights is not None else [], dtype='float64')
+
+    def add(self, values):
+        vals = values[~np.isnan(values)]
+        if len(vals):
+            self._compress(np.concatenate([self.means, vals]),
+                           np.concatenate([self.weights, np.ones(len(vals))]))
+
+    def merge(self, other):
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    # centroids whose left edge falls in the same unit of k(q) are merged
+    def _compress(self, means, weights):
+        if not len(means):
+            return
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        q_left = (np.cumsum(weights) - weights) / weights.sum()
+        k = self.delta / (2 * math.pi) * np.arcsin(2 * q_left - 1)
+        bucket = np.floor(k)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+
+    def quantile(self, q):
+        if not len(self.means):
+            return None
+        if len(self.means) == 1:
+            return float(self.means[0])
+        mids = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(q, mids, self.means))
+
+    def to_dict(self):
+        return {'delta': self.delta, 'means': self.means.round(6).tolist(),
+                'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['delta'], d['means'], d['weights'])
+
+
+# Distinct-count estimate over 2**p one-byte registers.
+class HyperLogLog:
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.registers = registers if registers is not None else np.zeros(1 << p, dtype='uint8')
+
+    def add(self, values):
+        vals = pd.Series(values).dropna()
+        if not len(vals):
+            return
+        h = pd.util.hash_array(vals.astype(str).to_numpy(dtype=object))
+        idx = (h >> np.uint64(64 - self.p)).astype('int64')
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # rest < 2**52 converts to float exactly, so frexp gives its bit length
+        _, bits = np.frexp(rest.astype('float64'))
+        rank = (64 - self.p - bits + 1).astype('uint8')
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / np.sum(2.0 ** -self.registers.astype('float64'))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)
+        return int(round(est))
+
+    def to_dict(self):
+        return {'p': self.p, 'registers': base64.b64encode(self.registers.tobytes()).decode()}
+
+    @classmethod
+    def from_dict(cls, d):
+        regs = np.frombuffer(base64.b64decode(d['registers']), dtype='uint8').copy()
+        return cls(d['p'], regs)
+
+
+# Pairwise-complete sums behind a Pearson correlation matrix. n[i, j] counts
+# rows where both columns are present, s[i, j] sums column i over those rows,
+# q[i, j] sums its squares and p[i, j] the products, so merging is plain
+# addition.
+class CoMoments:
+    def __init__(self, columns, n=None, s=None, q=None, p=None):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n, self.s, self.q, self.p = (np.zeros((k, k)) if a is None else np.asarray(a, dtype='float64')
+                                          for a in (n, s, q, p))
+
+    def add(self, arr):
+        present = ~np.isnan(arr)
+        m = present.astype('float64')
+        x = np.where(present, arr, 0.0)
+        self.n += m.T @ m
+        self.s += x.T @ m
+        self.q += (x * x).T @ m
+        self.p += x.T @ x
+
+    def merge(self, other):
+        for name in ('n', 's', 'q', 'p'):
+            getattr(self, name).__iadd__(getattr(other, name))
+        return self
+
+    # same as DataFrame.corr(): NaN where a pair has no spread
+    def correlation(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.p - self.s * self.s.T / self.n
+            var = self.q - self.s ** 2 / self.n
+            return cov / np.sqrt(var * var.T)
+
+    def to_dict(self):
+        return {'columns': self.columns, 'n': self.n.tolist(), 's': self.s.tolist(),
+                'q': self.q.tolist(), 'p': self.p.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['columns'], d['n'], d['s'], d['q'], d['p'])
+
+
+DISTINCT_COLS = ['Equipment Name']
+
+# All sketches for one dataset, fed chunk by chunk during ingest.
+class SketchSet:
+    def __init__(self, moments=None, digests=None, distinct=None, comoments=None):
+        self.moments = moments or {}
+        self.digests = digests or {}
+        self.distinct = distinct or {}
+        self.comoments = comoments
+
+    def add(self, df, numeric):
+        for col in numeric:
+            vals = df[col].to_numpy(dtype='float64')
+            self.moments.setdefault(col, Moments()).add(vals)
+            self.digests.setdefault(col, TDigest()).add(vals)
+        for col in DISTINCT_COLS:
+            if col in df.columns:
+                self.distinct.setdefault(col, HyperLogLog()).add(df[col])
+        if self.comoments is None:
+            self.comoments = CoMoments(numeric)
+        self.comoments.add(df[self.comoments.columns].to_numpy(dtype='float64'))
+
+    def merge(self, other):
+        empty = not (self.moments or self.distinct)
+        for name in ('moments', 'digests', 'distinct'):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            for col, sk in theirs.items():
+                if col in mine:
+                    mine[col].merge(sk)
+                else:
+                    mine[col] = type(sk).from_dict(sk.to_dict())
+        # correlations only combine over the same columns
+        theirs = other.comoments
+        if empty and theirs is not None:
+            self.comoments = CoMoments.from_dict(theirs.to_dict())
+        elif self.comoments and theirs and self.comoments.columns == theirs.columns:
+            self.comoments.merge(theirs)
+        else:
+            self.comoments = None
+        return self
+
+    def to_dict(self):
+        d = {
+            'moments': {c: s.to_dict() for c, s in self.moments.items()},
+            'digests': {c: s.to_dict() for c, s in self.digests.items()},
+            'distinct': {c: s.to_dict() for c, s in self.distinct.items()},
+        }
+        if self.comoments is not None:
+            d['comoments'] = self.comoments.to_dict()
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            {c: Moments.from_dict(v) for c, v in d.get('moments', {}).items()},
+            {c: TDigest.from_dict(v) for c, v in d.get('digests', {}).items()},
+            {c: HyperLogLog.from_dict(v) for c, v in d.get('distinct', {}).items()},
+            CoMoments.from_dict(d['comoments']) if 'comoments' in d else None,
+        )
+
+    # same keys as summary['columns'] where the sketches can answer them
+    def describe(self, quantiles=(0.5, 0.95, 0.99)):
+        out = {}
+        for col, mo in self.moments.items():
+            st = {'count': mo.n, 'mean': mo.mean if mo.n else None,
+                  'std': mo.std if mo.n else None,
+                  'min': mo.lo if mo.n else None, 'max': mo.hi if mo.n else None}
+            for q in quantiles:
+                st[f'p{int(q * 100)}'] = self.digests[col].quantile(q) if col in self.digests else None
+            out[col] = st
+        return {
+            'columns': out,
+            'distinct': {c: h.estimate() for c, h in self.distinct.items()},
+        }
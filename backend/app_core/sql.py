@@ -0,0 +1,96 @@
+import math
+import os
+from datetime import timezone
+import threading
+
+import pyarrow as pa
+from django.conf import settings
+
+from .columnar import columnar_path, load_table
+from .models import UploadedDataset
+
+try:
+    import duckdb
+except ImportError:  # the SQL endpoint is optional
+    duckdb = None
+
+class SQLError(Exception):
+    pass
+
+class SQLTimeout(SQLError):
+    pass
+
+# Read-only SQL across stored datasets in an in-process DuckDB.
+#
+# Each dataset's memory-mapped Arrow cache is registered as view ds_<id>
+# (nothing is copied), all_rows stacks them with a dataset_id column and
+# datasets holds id, name, uploaded_at (UTC) and row_count. Datasets without
+# a cache yet (see backfill_columnar) are left out rather than parsed inside
+# the request; asking for one by id is an error. Only one SELECT is
+# accepted, file and network access are switched off before it runs, and
+# it is interrupted after SQL_TIMEOUT_SECONDS.
+def run_sql(sql, params=None, ids=None):
+    if duckdb is None:
+        raise SQLError('SQL needs the duckdb package')
+    qs = UploadedDataset.objects.order_by('id').defer('summary', 'sketches')
+    if ids:
+        qs = qs.filter(id__in=ids)
+    datasets, uncached = [], []
+    for ds in qs:
+        (datasets if ds.csv_file and os.path.exists(columnar_path(ds)) else uncached).append(ds)
+    if ids and uncached:
+        raise SQLError(f'No columnar cache for datasets {[ds.id for ds in uncached]}, run backfill_columnar')
+
+    con = duckdb.connect(':memory:', config={'threads': settings.SQL_THREADS,
+                                             'memory_limit': settings.SQL_MEMORY_LIMIT})
+    try:
+        _register(con, datasets)
+        con.execute('SET enable_external_access = false')
+        con.execute('SET lock_configuration = true')
+
+        try:
+            statements = con.extract_statements(sql)
+        except duckdb.Error as e:
+            raise SQLError(str(e).splitlines()[0])
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise SQLError('Only a single SELECT statement is allowed')
+
+        timer = threading.Timer(settings.SQL_TIMEOUT_SECONDS, con.interrupt)
+        timer.start()
+        try:
+            cur = con.execute(sql, params or None)
+            rows = cur.fetchmany(settings.SQL_MAX_ROWS + 1)
+        except duckdb.InterruptException:
+            raise SQLTimeout(f'Query took longer than {settings.SQL_TIMEOUT_SECONDS:g}s')
+        except duckdb.Error as e:
+            raise SQLError(str(e).splitlines()[0])
+        finally:
+            timer.cancel()
+        columns = [d[0] for d in cur.description]
+    finally:
+        con.close()
+
+    truncated = len(rows) > settings.SQL_MAX_ROWS
+    return {'columns': columns, 'rows': [[_cell(v) for v in r] for r in rows[:settings.SQL_MAX_ROWS]],
+            'truncated': truncated}
+
+def _cell(v):
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+# naive UTC, so results don't need pytz to come back
+def _utc(dt):
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _register(con, datasets):
+    con.execute('CREATE TABLE datasets (id INTEGER, name VARCHAR, uploaded_at TIMESTAMP, row_count BIGINT)')
+    con.executemany('INSERT INTO datasets VALUES (?, ?, ?, ?)',
+                    [(ds.id, ds.name, _utc(ds.uploaded_at), ds.row_count) for ds in datasets])
+    parts = []
+    for ds in datasets:
+        try:
+            con.register(f'ds_{ds.id}', load_table(ds))
+        except (OSError, pa.ArrowException) as e:
+            raise SQLError(f'Dataset {ds.id} cannot be read: {e}')
+        parts.append(f'SELECT {ds.id} AS dataset_id, * FROM ds_{ds.id}')
+    if parts:
+        con.execute('CREATE VIEW all_rows AS ' + ' UNION ALL BY NAME '.join(parts))
@@ -0,0 +1,206 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.5, 0.95, 0.99)
+HIST_BINS = 20
+
+# json has no NaN, and numpy scalars need unwrapping
+def _num(x):
+    x = float(x)
+    return round(x, 4) if np.isfinite(x) else None
+
+def numeric_columns(df):
+    return [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+
+def _histogram(col, lo, hi):
+    vals = col[~np.isnan(col)]
+    if not len(vals):
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(vals, bins=HIST_BINS, range=(lo, hi) if lo < hi else None)
+    return {'edges': [_num(e) for e in edges], 'counts': counts.tolist()}
+
+# per-column stats, correlations and per-Type aggregates in one pass over
+# a float matrix of the numeric columns
+def compute_statistics(df):
+    cols = numeric_columns(df)
+    if not cols or not len(df):
+        return {'columns': {}, 'correlation': {'columns': cols, 'matrix': []}, 'by_type': {}}
+
+    arr = df[cols].to_numpy(dtype='float64')
+    nulls = np.isnan(arr).sum(axis=0)
+    # all-NaN columns make numpy warn, _num already maps the NaNs to None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(arr, axis=0)
+        std = np.nanstd(arr, axis=0, ddof=1)
+        lo = np.nanmin(arr, axis=0)
+        hi = np.nanmax(arr, axis=0)
+        qs = np.nanquantile(arr, QUANTILES, axis=0)
+
+    columns = {}
+    for i, col in enumerate(cols):
+        stats = {
+            'count': int(len(arr) - nulls[i]),
+            'nulls': int(nulls[i]),
+            'mean': _num(mean[i]),
+            'std': _num(std[i]),
+            'min': _num(lo[i]),
+            'max': _num(hi[i]),
+        }
+        for q, v in zip(QUANTILES, qs[:, i]):
+            stats[f'p{int(q * 100)}'] = _num(v)
+        stats['histogram'] = _histogram(arr[:, i], lo[i], hi[i])
+        columns[col] = stats
+
+    corr = pd.DataFrame(arr, columns=cols).corr().to_numpy()
+    by_type = {}
+    if 'Type' in df.columns:
+        grouped = df.groupby('Type', observed=True)[cols].agg(['count', 'mean', 'min', 'max'])
+        for t, row in grouped.iterrows():
+            by_type[str(t)] = {c: {'count': int(row[(c, 'count')]),
+                                   **{m: _num(row[(c, m)]) for m in ('mean', 'min', 'max')}}
+                               for c in cols}
+
+    return {
+        'columns': columns,
+        'correlation': {'columns': cols, 'matrix': [[_num(v) for v in r] for r in corr]},
+        'by_type': by_type,
+    }
+
+# Same output as compute_statistics for data too big to hold at once.
+# Count, mean, std, min, max and correlations come from the sketches and
+# quantiles from the t-digests; nulls, histograms and per-Type aggregates
+# take one pass over frames, a chunk at a time.
+def streamed_statistics(frames, sketches):
+    cols = sketches.comoments.columns if sketches.comoments else []
+    nulls = np.zeros(len(cols), dtype='int64')
+    hists = np.zeros((len(cols), HIST_BINS), dtype='int64')
+    bounds = [(sketches.moments[c].lo, sketches.moments[c].hi) for c in cols]
+    groups, rows = None, 0
+    for df in frames:
+        rows += len(df)
+        arr = df[cols].to_numpy(dtype='float64')
+        nulls += np.isnan(arr).sum(axis=0)
+        for i, (lo, hi) in enumerate(bounds):
+            vals = arr[:, i][~np.isnan(arr[:, i])]
+            if len(vals):
+                # a single value gets numpy's default range around it
+                hists[i] += np.histogram(vals, bins=HIST_BINS, range=(lo, hi) if lo < hi else (lo - 0.5, hi + 0.5))[0]
+        if 'Type' in df.columns and cols:
+            part = df.groupby('Type', observed=True)[cols].agg(['count', 'sum', 'min', 'max'])
+            if groups is not None:
+                part = pd.concat([groups, part]).groupby(level=0).agg(
+                    {key: 'sum' if key[1] in ('count', 'sum') else key[1] for key in part.columns})
+            groups = part
+    if not cols or not rows:
+        return {'columns': {}, 'correlation': {'columns': cols, 'matrix': []}, 'by_type': {}}
+
+    columns = {}
+    for i, col in enumerate(cols):
+        mo, digest = sketches.moments[col], sketches.digests[col]
+        lo, hi = bounds[i]
+        stats = {
+            'count': mo.n,
+            'nulls': int(nulls[i]),
+            'mean': _num(mo.mean) if mo.n else None,
+            'std': _num(mo.std) if mo.n > 1 else None,
+            'min': _num(lo) if mo.n else None,
+            'max': _num(hi) if mo.n else None,
+        }
+        for q in QUANTILES:
+            v = digest.quantile(q)
+            stats[f'p{int(q * 100)}'] = _num(v) if v is not None else None
+        stats['histogram'] = {'edges': [], 'counts': []}
+        if mo.n:
+            edges = np.linspace(lo, hi, HIST_BINS + 1) if lo < hi else np.linspace(lo - 0.5, hi + 0.5, HIST_BINS + 1)
+            stats['histogram'] = {'edges': [_num(e) for e in edges], 'counts': hists[i].tolist()}
+        columns[col] = stats
+
+    by_type = {}
+    for t, row in (groups.iterrows() if groups is not None else ()):
+        by_type[str(t)] = {}
+        for c in cols:
+            n = int(row[(c, 'count')])
+            by_type[str(t)][c] = {'count': n, 'mean': _num(row[(c, 'sum')] / n) if n else None,
+                                  'min': _num(row[(c, 'min')]), 'max': _num(row[(c, 'max')])}
+
+    corr = sketches.comoments.correlation()
+    return {
+        'columns': columns,
+        'correlation': {'columns': cols, 'matrix': [[_num(v) for v in r] for r in corr]},
+        'by_type': by_type,
+    }
+
+# rounding in _num moves stored edges by up to this much
+EDGE_TOLERANCE = 5e-5
+
+# adds new values to a stored histogram; when they fall outside it the bins
+# are respread over the wider range, old counts moving with their midpoints
+def _extend_histogram(hist, col, lo, hi):
+    vals = col[~np.isnan(col)]
+    if not hist['edges']:
+        return _histogram(col, lo, hi)
+    if not len(vals):
+        return hist
+    edges = np.asarray(hist['edges'], dtype='float64')
+    counts = np.asarray(hist['counts'], dtype='float64')
+    if lo < edges[0] - EDGE_TOLERANCE or hi > edges[-1] + EDGE_TOLERANCE:
+        wider = np.linspace(min(lo, edges[0]), max(hi, edges[-1]), HIST_BINS + 1)
+        counts, _ = np.histogram((edges[:-1] + edges[1:]) / 2, bins=wider, weights=counts)
+        edges = wider
+    counts = counts + np.histogram(np.clip(vals, edges[0], edges[-1]), bins=edges)[0]
+    return {'edges': [_num(e) for e in edges], 'counts': counts.astype(int).tolist()}
+
+def _merge_group(old, new):
+    if not old or not old['count']:
+        return new
+    if not new['count']:
+        return old
+    n = old['count'] + new['count']
+    return {'count': n,
+            'mean': _num((old['mean'] * old['count'] + new['mean'] * new['count']) / n),
+            'min': min(old['min'], new['min']), 'max': max(old['max'], new['max'])}
+
+# Stats of a dataset after rows were appended, from its stored statistics,
+# its sketches (already fed the new rows) and a frame of just the new rows.
+# Counts, mean, std, min and max come out exact; quantiles now come from
+# the t-digests and old histogram counts are respread if the range grows.
+def extend_statistics(stats, df, sketches):
+    cols = stats['correlation']['columns']
+    if not cols:
+        return stats
+    arr = df[cols].to_numpy(dtype='float64')
+    nulls = np.isnan(arr).sum(axis=0)
+
+    columns = {}
+    for i, col in enumerate(cols):
+        old = stats['columns'].get(col, {'nulls': 0, 'histogram': {'edges': [], 'counts': []}})
+        mo, digest = sketches.moments[col], sketches.digests[col]
+        columns[col] = {
+            'count': mo.n,
+            'nulls': old['nulls'] + int(nulls[i]),
+            'mean': _num(mo.mean) if mo.n else None,
+            'std': _num(mo.std) if mo.n > 1 else None,
+            'min': _num(mo.lo) if mo.n else None,
+            'max': _num(mo.hi) if mo.n else None,
+        }
+        for q in QUANTILES:
+            v = digest.quantile(q)
+            columns[col][f'p{int(q * 100)}'] = _num(v) if v is not None else None
+        columns[col]['histogram'] = _extend_histogram(old['histogram'], arr[:, i], mo.lo, mo.hi)
+
+    corr = sketches.comoments.correlation()
+    by_type = dict(stats['by_type'])
+    if 'Type' in df.columns:
+        fresh = compute_statistics(df[cols + ['Type']])['by_type']
+        for t, per_col in fresh.items():
+            old = by_type.get(t, {})
+            by_type[t] = {c: _merge_group(old.get(c), per_col[c]) for c in cols}
+
+    return {
+        'columns': columns,
+        'correlation': {'columns': cols, 'matrix': [[_num(v) for v in r] for r in corr]},
+        'by_type': by_type,
+    }
@@ -1,10 +1,210 @@
-from .models import UploadedDataset
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .catalog import materialize_stats
+from .columnar import columnar_path
+from .ingest import IngestError, ingest_csv
+from .metrics import rows_processed, span
+from .models import UploadedDataset, UploadJob, UploadSession
+from .reports import render_report
+from .utils import file_sha256
 
 MAX_HISTORY = 5
+# seconds between progress writes to the job row
+PROGRESS_EVERY = 0.5
+
+_executor = None
+# (dataset id, full) pairs with a render already queued
+_pending_reports = set()
+_pending_lock = threading.Lock()
 
-# delete old uploads, keep only 5
+# delete old uploads, keep only 5. Several workers may run this at once:
+# the rows are locked first so a job pointing at one cannot slip in between
+# Django nulling the job references and the delete itself
 def cleanup_old_datasets():
-    all_ds = UploadedDataset.objects.order_by('-uploaded_at')
-    if all_ds.count() > MAX_HISTORY:
-        keep_ids = list(all_ds[:MAX_HISTORY].values_list('id', flat=True))
-        UploadedDataset.objects.exclude(id__in=keep_ids).delete()
+    with transaction.atomic():
+        all_ds = UploadedDataset.objects.order_by('-uploaded_at')
+        if all_ds.count() > MAX_HISTORY:
+            keep_ids = list(all_ds[:MAX_HISTORY].values_list('id', flat=True))
+            old = UploadedDataset.objects.select_for_update().exclude(id__in=keep_ids)
+            UploadedDataset.objects.filter(id__in=list(old.values_list('id', flat=True))).delete()
+
+# A failed job's stored csv, and any cache built from it, is only kept if a
+# dataset shares the file
+def remove_job_files(job):
+    if not job.csv_file or UploadedDataset.objects.filter(csv_file=job.csv_file.name).exists():
+        return
+    for path in (columnar_path(job), columnar_path(job) + '.tmp'):
+        if os.path.exists(path):
+            os.remove(path)
+    job.csv_file.delete(save=False)
+
+def fail_job(job, error):
+    UploadJob.objects.filter(id=job.id).update(status=UploadJob.FAILED, error=error)
+    remove_job_files(job)
+
+# Jobs a stopped process left queued or running would be polled forever.
+# Only safe before any worker starts: start.sh runs it through
+# `manage.py cleanup_uploads --interrupted`. Returns how many failed.
+def fail_interrupted_jobs():
+    jobs = list(UploadJob.objects.filter(status__in=[UploadJob.QUEUED, UploadJob.RUNNING]))
+    for job in jobs:
+        fail_job(job, 'Interrupted by a server restart, upload the file again')
+    return len(jobs)
+
+# Drops finished jobs older than UPLOAD_JOB_RETENTION_HOURS and resumable
+# uploads left unfinished for UPLOAD_SESSION_HOURS, with their .part files
+# (and any .part file no session owns). Returns (jobs, sessions) removed.
+def cleanup_uploads():
+    now = timezone.now()
+    jobs, _ = UploadJob.objects.filter(
+        status__in=[UploadJob.DONE, UploadJob.FAILED],
+        created_at__lt=now - timedelta(hours=settings.UPLOAD_JOB_RETENTION_HOURS)).delete()
+
+    cutoff = now - timedelta(hours=settings.UPLOAD_SESSION_HOURS)
+    stale = list(UploadSession.objects.filter(created_at__lt=cutoff))
+    for sess in stale:
+        if os.path.exists(sess.part_path):
+            os.remove(sess.part_path)
+        sess.delete()
+    parts = os.path.join(settings.MEDIA_ROOT, 'uploads')
+    if os.path.isdir(parts):
+        live = {f'{i}.part' for i in UploadSession.objects.values_list('id', flat=True)}
+        for name in set(os.listdir(parts)) - live:
+            path = os.path.join(parts, name)
+            if name.endswith('.part') and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+    return jobs, len(stale)
+
+# in-process worker pool, no broker needed
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_WORKERS,
+                                       thread_name_prefix='upload')
+    return _executor
+
+# Lets queued uploads and renders finish, along with anything they queue in
+# turn, then stops the pool; the next get_executor() starts a fresh one
+def shutdown_executor():
+    global _executor
+    while _executor is not None:
+        executor, _executor = _executor, None
+        executor.shutdown(wait=True)
+
+def enqueue_upload(job):
+    transaction.on_commit(lambda: get_executor().submit(process_upload, job.id))
+
+# An upload whose bytes match a stored dataset becomes a new dataset that
+# shares its csv, columnar cache, summary and sketches, so nothing is parsed.
+# Returns the finished job (a new one, or the given queued job moved onto
+# the shared file), or None when the content is new. The source row is
+# locked so a concurrent delete cannot drop the files in between.
+def publish_duplicate(name, digest, size, job=None):
+    with transaction.atomic():
+        src = (UploadedDataset.objects.select_for_update()
+               .filter(content_hash=digest).order_by('-uploaded_at').first())
+        if src is None:
+            return None
+        ds = UploadedDataset.objects.create(
+            name=name, csv_file=src.csv_file.name,
+            summary=src.summary, sketches=src.sketches, row_count=src.row_count,
+            content_hash=digest
+        )
+        materialize_stats(ds)
+        fields = dict(name=name, csv_file=src.csv_file.name, status=UploadJob.DONE, dataset=ds,
+                      rows_processed=ds.row_count, bytes_total=size, bytes_processed=size,
+                      content_hash=digest)
+        if job is None:
+            job = UploadJob.objects.create(**fields)
+        else:
+            UploadJob.objects.filter(id=job.id).update(**fields)
+    cleanup_old_datasets()
+    queue_report(ds.id)
+    return job
+
+# pre-render the PDF so the first download is served from disk
+def render_report_task(dataset_id, full=False):
+    close_old_connections()
+    try:
+        ds = UploadedDataset.objects.filter(id=dataset_id).first()
+        if ds:
+            with span('report_full' if full else 'report'):
+                render_report(ds, full)
+    finally:
+        with _pending_lock:
+            _pending_reports.discard((dataset_id, full))
+        connection.close()
+
+# queue a render unless one for the same report is already waiting
+def queue_report(dataset_id, full=False):
+    with _pending_lock:
+        if (dataset_id, full) in _pending_reports:
+            return
+        _pending_reports.add((dataset_id, full))
+    get_executor().submit(render_report_task, dataset_id, full)
+
+# parse, summarise and publish one queued upload
+def process_upload(job_id):
+    close_old_connections()
+    job = None
+    try:
+        job = UploadJob.objects.get(id=job_id)
+        UploadJob.objects.filter(id=job_id).update(status=UploadJob.RUNNING)
+        last = [0.0]
+
+        def progress(rows, pos):
+            now = time.monotonic()
+            if now - last[0] >= PROGRESS_EVERY:
+                last[0] = now
+                UploadJob.objects.filter(id=job_id).update(rows_processed=rows, bytes_processed=pos)
+
+        # resumable uploads arrive unhashed, they are hashed and checked
+        # for duplicates here rather than inside the finalize request
+        digest = job.content_hash
+        if not digest:
+            with job.csv_file.open('rb') as src, span('hash'):
+                digest = file_sha256(src)
+            own = job.csv_file.name
+            if publish_duplicate(job.name, digest, job.bytes_total, job=job):
+                default_storage.delete(own)
+                return
+
+        try:
+            with job.csv_file.open('rb') as src, span('ingest'):
+                summary, rows, sketches = ingest_csv(src, columnar_path(job), progress=progress)
+        except IngestError as e:
+            fail_job(job, f'Bad CSV: {e}')
+            return
+
+        # the dataset reuses the job's stored file, nothing is copied; it
+        # and the job link become visible together
+        with span('publish'), transaction.atomic():
+            ds = UploadedDataset.objects.create(
+                name=job.name, csv_file=job.csv_file.name,
+                summary=summary, sketches=sketches, row_count=rows,
+                content_hash=digest
+            )
+            materialize_stats(ds)
+            UploadJob.objects.filter(id=job_id).update(
+                status=UploadJob.DONE, dataset=ds, rows_processed=rows,
+                bytes_processed=job.bytes_total
+            )
+        rows_processed(rows, 'upload')
+        cleanup_old_datasets()
+        cleanup_uploads()
+        queue_report(ds.id)
+    except Exception as e:
+        UploadJob.objects.filter(id=job_id).update(status=UploadJob.FAILED, error=str(e))
+        if job is not None:
+            remove_job_files(job)
+    finally:
+        connection.close()
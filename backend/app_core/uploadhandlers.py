@@ -0,0 +1,21 @@
+import hashlib
+
+from django.core.files.uploadhandler import FileUploadHandler
+
+# SHA-256 of each uploaded file, computed while it streams in. Sits in front
+# of the storing handlers and passes every chunk on untouched; the hex digests
+# land in request.upload_hashes by field name.
+class HashingUploadHandler(FileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_hashes'):
+            self.request.upload_hashes = {}
+        self.request.upload_hashes[self.field_name] = self.sha.hexdigest()
+        return None
@@ -4,9 +4,22 @@ from . import views
 
 urlpatterns = [
     path('upload/', views.UploadView.as_view(), name='upload'),
+    path('uploads/', views.UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/<int:pk>/', views.UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('uploads/<int:pk>/chunks/<int:n>/', views.UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<int:pk>/finalize/', views.UploadFinalizeView.as_view(), name='upload-finalize'),
+    path('jobs/<int:pk>/', views.JobView.as_view(), name='job'),
+    path('append/<int:pk>/', views.AppendView.as_view(), name='append'),
     path('history/', views.HistoryView.as_view(), name='history'),
+    path('datasets/', views.DatasetSearchView.as_view(), name='dataset-search'),
+    path('types/', views.TypeTotalsView.as_view(), name='type-totals'),
     path('summary/', views.SummaryView.as_view(), name='summary'),
     path('chart-data/', views.ChartDataView.as_view(), name='chart-data'),
+    path('rows/', views.RowsView.as_view(), name='rows'),
+    path('query/', views.QueryView.as_view(), name='query'),
+    path('sql/', views.SqlView.as_view(), name='sql'),
+    path('series/', views.SeriesView.as_view(), name='series'),
+    path('combined-stats/', views.CombinedStatsView.as_view(), name='combined-stats'),
     path('report/', views.ReportView.as_view(), name='report'),
     path('delete/<int:pk>/', views.DeleteDatasetView.as_view(), name='delete-dataset'),
     path('auth/token/', obtain_auth_token, name='api-token'),
@@ -1,32 +1,133 @@
+import hashlib
+import operator
+import re
+from collections import Counter
+
 import pandas as pd
 
-# read csv into dataframe
-def parse_csv_file(file_obj):
-    df = pd.read_csv(file_obj)
-    df.columns = df.columns.str.strip()
+from .csvparse import CATEGORY, SchemaMismatch, infer_schema, read_chunks
+from .stats import compute_statistics
+
+NUMERIC_COLS = ['Flowrate', 'Pressure', 'Temperature']
+PARSE_CHUNK_ROWS = 1 << 20
+
+# filter expressions look like "Pressure>5" or "Type==Pump"
+FILTER_RE = re.compile(r'^\s*(.+?)\s*(==|!=|>=|<=|>|<)\s*(.*?)\s*$')
+FILTER_OPS = {'==': operator.eq, '!=': operator.ne, '>': operator.gt,
+              '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+# sha256 of a stored file, read in blocks
+def file_sha256(file_obj, block=1024 * 1024):
+    h = hashlib.sha256()
+    for data in iter(lambda: file_obj.read(block), b''):
+        h.update(data)
+    return h.hexdigest()
+
+# read csv into a typed dataframe in one pass (see csvparse)
+def parse_csv_file(file_obj, engine=None):
+    start = file_obj.tell()
+    schema = infer_schema(file_obj, NUMERIC_COLS)
+    try:
+        df = pd.concat(read_chunks(file_obj, schema, PARSE_CHUNK_ROWS, engine), ignore_index=True)
+    except SchemaMismatch:
+        file_obj.seek(start)
+        schema = schema.loosened(file_obj)
+        df = pd.concat(read_chunks(file_obj, schema, PARSE_CHUNK_ROWS, engine), ignore_index=True)
+    # chunks with different categories concat to plain strings
+    for col in schema.columns(CATEGORY):
+        df[col] = df[col].astype('category')
     return df
 
-# compute stats from equipment dataframe
-def compute_summary(df):
-    numeric_cols = ['Flowrate', 'Pressure', 'Temperature']
+# running totals so summaries can be built one chunk at a time
+class SummaryAccumulator:
+    def __init__(self, numeric_cols=NUMERIC_COLS):
+        self.rows = 0
+        self.sums = {}
+        self.counts = {}
+        self.numeric_cols = numeric_cols
+        self.types = Counter()
+
+    def add(self, df):
+        self.rows += len(df)
+        for col in self.numeric_cols:
+            if col in df.columns:
+                self.sums[col] = self.sums.get(col, 0.0) + float(df[col].sum())
+                self.counts[col] = self.counts.get(col, 0) + int(df[col].count())
+        if 'Type' in df.columns:
+            counts = df['Type'].value_counts()
+            # categoricals also list values that are not in this chunk
+            self.types.update(counts[counts > 0].to_dict())
+
+    def result(self):
+        # averages for each param
+        averages = {}
+        for col in self.numeric_cols:
+            if col in self.counts:
+                n = self.counts[col]
+                averages[col] = round(self.sums[col] / n, 2) if n else 0.0
+        return {
+            'total_count': self.rows,
+            'averages': averages,
+            'type_distribution': {str(k): int(v) for k, v in self.types.most_common()},
+        }
+
+# coerce known numeric columns in place, bad values become NaN
+def coerce_numeric(df, numeric_cols=NUMERIC_COLS):
     for col in numeric_cols:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
 
-    # averages for each param
-    averages = {}
-    for col in numeric_cols:
-        if col in df.columns:
-            avg = df[col].mean()
-            averages[col] = round(avg, 2) if pd.notna(avg) else 0.0
-
-    # count by equipment type
-    type_dist = {}
-    if 'Type' in df.columns:
-        type_dist = df['Type'].value_counts().to_dict()
-
-    return {
-        'total_count': len(df),
-        'averages': averages,
-        'type_distribution': type_dist,
-    }
+# compute stats from equipment dataframe
+def compute_summary(df):
+    coerce_numeric(df)
+    acc = SummaryAccumulator()
+    acc.add(df)
+    summary = acc.result()
+    summary.update(compute_statistics(df))
+    return summary
+
+# parse "col<op>value" into a tuple, raises ValueError on bad input
+def parse_filter(expr, columns):
+    m = FILTER_RE.match(expr)
+    if not m:
+        raise ValueError(f'Bad filter: {expr}')
+    col, op, val = m.groups()
+    if col not in columns:
+        raise ValueError(f'Unknown column: {col}')
+    return col, op, val
+
+# project, filter and sort a dataframe for the rows endpoint
+def query_rows(df, columns=None, ordering=None, filters=()):
+    for col, op, val in filters:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            try:
+                val = float(val)
+            except (TypeError, ValueError):
+                raise ValueError(f'{col} expects a number')
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            try:
+                val = pd.Timestamp(val)
+            except (TypeError, ValueError):
+                raise ValueError(f'{col} expects a date')
+            if series.dt.tz is not None and val.tzinfo is None:
+                val = val.tz_localize(series.dt.tz)
+        try:
+            mask = FILTER_OPS[op](series, val)
+        except (TypeError, ValueError):
+            raise ValueError(f'Bad filter value for {col}: {val}')
+        df = df[mask]
+
+    if ordering:
+        col = ordering.lstrip('-')
+        if col not in df.columns:
+            raise ValueError(f'Unknown column: {col}')
+        df = df.sort_values(col, ascending=not ordering.startswith('-'), kind='stable')
+
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError(f'Unknown column: {missing[0]}')
+        df = df[columns]
+    return df
@@ -1,21 +1,40 @@
-import io
+import os
+from collections import Counter
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from django.contrib.auth.models import User
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 
-from .models import UploadedDataset
-from .serializers import DatasetSerializer
-from .utils import compute_summary, parse_csv_file
-from .tasks import cleanup_old_datasets
+from .append import append_rows
+from .caching import conditional_response, ranged_file_response
+from .catalog import find_datasets, parse_stat_filter, type_totals
+from .columnar import load_frame, load_table
+from .downsample import METHODS, downsample
+from .ingest import IngestError
+from .metrics import render as render_metrics, span
+from .reports import REPORT_TEMPLATE_VERSION, ensure_report, report_path
+from .models import UploadedDataset, UploadJob, UploadSession
+from .sketches import SketchSet
+from .serializers import DatasetBriefSerializer, DatasetSerializer, JobSerializer, UploadSessionSerializer
+from .pagination import FrameRecords, RowPagination
+from .query import parse_query, query_columns, query_key, run_query
+from .renderers import DATA_RENDERERS, wants_binary
+from .sql import SQLError, SQLTimeout, duckdb, run_sql
+from .utils import file_sha256, parse_filter, query_rows
+from .tasks import enqueue_upload, publish_duplicate, queue_report
+
+# seconds a client should wait before asking for a full report again
+REPORT_RETRY_AFTER = 5
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
@@ -37,25 +56,136 @@ class RegisterView(APIView):
 class UploadView(APIView):
     permission_classes = [IsAuthenticated]
 
-    # Handles CSV upload, parses it, and creates dataset
+    # Stores the CSV and queues it, parsing happens in the worker pool.
+    # A file already uploaded before is published right away (201)
     def post(self, request):
-        f = request.FILES.get('file')
+        with span('receive'):
+            f = request.FILES.get('file')
         if not f:
             return Response({'error': 'No file provided'}, status=400)
 
+        with span('hash'):
+            digest = getattr(request, 'upload_hashes', {}).get('file') or file_sha256(f)
+        with span('dedup'):
+            job = publish_duplicate(f.name, digest, f.size)
+        if job:
+            return Response(JobSerializer(job).data, status=201)
+        with span('store'):
+            job = UploadJob.objects.create(name=f.name, csv_file=f, bytes_total=f.size, content_hash=digest)
+        enqueue_upload(job)
+        return Response(JobSerializer(job).data, status=202)
+
+class JobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
         try:
-            df = parse_csv_file(f)
-        except Exception as e:
-            return Response({'error': f'Bad CSV: {e}'}, status=400)
+            job = UploadJob.objects.select_related('dataset').get(id=pk)
+        except UploadJob.DoesNotExist:
+            return Response({'error': 'Not found'}, status=404)
+        return Response(JobSerializer(job).data)
+
+class UploadSessionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Starts a resumable upload, the client then PUTs chunks in order
+    def post(self, request):
+        name = str(request.data.get('name', '')).strip()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = -1
+        if not name or size <= 0:
+            return Response({'error': 'name and size required'}, status=400)
+
+        sess = UploadSession.objects.create(name=name, size=size, chunk_size=settings.UPLOAD_CHUNK_BYTES)
+        os.makedirs(os.path.dirname(sess.part_path), exist_ok=True)
+        open(sess.part_path, 'wb').close()
+        return Response(UploadSessionSerializer(sess).data, status=201)
+
+class UploadSessionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Where to resume from after a dropped connection
+    def get(self, request, pk):
+        try:
+            sess = UploadSession.objects.get(id=pk)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Not found'}, status=404)
+        return Response(UploadSessionSerializer(sess).data)
+
+class UploadChunkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Appends chunk n, chunks already received are acknowledged again
+    def put(self, request, pk, n):
+        with transaction.atomic():
+            try:
+                sess = UploadSession.objects.select_for_update().get(id=pk)
+            except UploadSession.DoesNotExist:
+                return Response({'error': 'Not found'}, status=404)
+            if n < sess.next_chunk:
+                return Response(UploadSessionSerializer(sess).data)
+            if n > sess.next_chunk:
+                return Response({'error': f'Expected chunk {sess.next_chunk}',
+                                 'next_chunk': sess.next_chunk}, status=409)
+
+            data = request.stream.read(sess.chunk_size + 1) if request.stream else b''
+            last = sess.received + len(data) == sess.size
+            if not data or len(data) > sess.chunk_size or (len(data) < sess.chunk_size and not last) \
+                    or sess.received + len(data) > sess.size:
+                return Response({'error': 'Bad chunk size'}, status=400)
+
+            with open(sess.part_path, 'r+b') as out:
+                out.seek(sess.received)
+                out.write(data)
+                out.truncate()
+            sess.received += len(data)
+            sess.next_chunk += 1
+            sess.save(update_fields=['received', 'next_chunk'])
+        return Response(UploadSessionSerializer(sess).data)
+
+class UploadFinalizeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Moves the assembled file into storage and queues it like a normal upload;
+    # the worker hashes it and publishes a duplicate without parsing it
+    def post(self, request, pk):
+        try:
+            sess = UploadSession.objects.get(id=pk)
+        except UploadSession.DoesNotExist:
+            return Response({'error': 'Not found'}, status=404)
+        if not sess.complete:
+            return Response({'error': f'Only {sess.received} of {sess.size} bytes received'}, status=400)
+
+        name = default_storage.get_available_name(f'datasets/{os.path.basename(sess.name)}')
+        dest = default_storage.path(name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(sess.part_path, dest)
+        job = UploadJob.objects.create(name=sess.name, csv_file=name, bytes_total=sess.size)
+        sess.delete()
+        enqueue_upload(job)
+        return Response(JobSerializer(job).data, status=202)
 
-        summary = compute_summary(df)
+class AppendView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Adds the rows of a csv with the same columns to a stored dataset
+    def post(self, request, pk):
+        f = request.FILES.get('file')
+        if not f:
+            return Response({'error': 'No file provided'}, status=400)
+        try:
+            ds = UploadedDataset.objects.get(id=pk)
+        except UploadedDataset.DoesNotExist:
+            return Response({'error': 'Not found'}, status=404)
+        digest = getattr(request, 'upload_hashes', {}).get('file') or file_sha256(f)
         f.seek(0)
-        ds = UploadedDataset.objects.create(
-            name=f.name, csv_file=f,
-            summary=summary, row_count=len(df)
-        )
-        cleanup_old_datasets()
-        return Response(DatasetSerializer(ds).data, status=201)
+        try:
+            ds = append_rows(ds, f, digest)
+        except IngestError as e:
+            return Response({'error': f'Bad CSV: {e}'}, status=400)
+        return Response(DatasetSerializer(ds).data)
 
 class HistoryView(APIView):
     permission_classes = [IsAuthenticated]
@@ -64,6 +194,35 @@ class HistoryView(APIView):
         ds = UploadedDataset.objects.all()[:5]
         return Response(DatasetSerializer(ds, many=True).data)
 
+class DatasetSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # History filtered and sorted on the stats tables, e.g.
+    # ?where=Pressure.mean>7&type=Valve&ordering=-Pressure.mean
+    def get(self, request):
+        try:
+            filters = [parse_stat_filter(f) for f in request.query_params.getlist('where')]
+            qs, names = find_datasets(filters, request.query_params.getlist('type'),
+                                      request.query_params.get('ordering'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        paginator = RowPagination()
+        page = paginator.paginate_queryset(qs.defer('summary', 'sketches'), request, view=self)
+        results = []
+        for ds in page:
+            item = DatasetBriefSerializer(ds).data
+            item['stats'] = {ref: getattr(ds, name) for ref, name in names.items()}
+            results.append(item)
+        return paginator.get_paginated_response(results)
+
+class TypeTotalsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Row and dataset counts per equipment type across the history
+    def get(self, request):
+        return Response(list(type_totals()))
+
 class SummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -73,96 +232,285 @@ class SummaryView(APIView):
             return Response({'error': 'Missing id'}, status=400)
         try:
             ds = UploadedDataset.objects.get(id=did)
-        except UploadedDataset.DoesNotExist:
+        except (UploadedDataset.DoesNotExist, ValueError):
             return Response({'error': 'Not found'}, status=404)
-        return Response(ds.summary)
+        return conditional_response(request, ds, lambda: Response(ds.summary))
 
 class ChartDataView(APIView):
     permission_classes = [IsAuthenticated]
 
-    # Returns data formatted for Chart.js and tables
+    # Returns data formatted for Chart.js, rows live on /rows/
     def get(self, request):
         did = request.query_params.get('id')
         if not did:
             return Response({'error': 'Missing id'}, status=400)
         try:
-            ds = UploadedDataset.objects.get(id=did)
-        except UploadedDataset.DoesNotExist:
+            with span('db'):
+                ds = UploadedDataset.objects.get(id=did)
+        except (UploadedDataset.DoesNotExist, ValueError):
             return Response({'error': 'Not found'}, status=404)
 
+        with span('build'):
+            return conditional_response(request, ds, lambda: self.build(ds))
+
+    def build(self, ds):
         dist = ds.summary.get('type_distribution', {})
         avgs = ds.summary.get('averages', {})
 
-        rows = []
-        try:
-            df = parse_csv_file(ds.csv_file)
-            rows = df.to_dict(orient='records')
-        except Exception:
-            pass
-
         return Response({
             'labels': list(dist.keys()),
             'counts': list(dist.values()),
             'averages': avgs,
-            'rows': rows,
+            'row_count': ds.row_count,
         })
 
-class ReportView(APIView):
+class RowsView(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = DATA_RENDERERS
 
-    # Generates a PDF report using ReportLab
+    # Paged table rows with optional columns, ordering and filters
     def get(self, request):
         did = request.query_params.get('id')
         if not did:
             return Response({'error': 'Missing id'}, status=400)
         try:
             ds = UploadedDataset.objects.get(id=did)
-        except UploadedDataset.DoesNotExist:
+        except (UploadedDataset.DoesNotExist, ValueError):
             return Response({'error': 'Not found'}, status=404)
+        return conditional_response(request, ds, lambda: self.build(request, ds))
 
-        buf = io.BytesIO()
-        doc = SimpleDocTemplate(buf, pagesize=A4)
-        styles = getSampleStyleSheet()
-        els = []
-
-        els.append(Paragraph("Equipment Data Report", styles['Title']))
-        els.append(Spacer(1, 0.3 * inch))
-        els.append(Paragraph(f"File: {ds.name}", styles['Normal']))
-        els.append(Paragraph(f"Uploaded: {ds.uploaded_at:%Y-%m-%d %H:%M}", styles['Normal']))
-        els.append(Paragraph(f"Rows: {ds.row_count}", styles['Normal']))
-        els.append(Spacer(1, 0.3 * inch))
-
-        tbl_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-        ])
+    def build(self, request, ds):
+        try:
+            table = load_table(ds)
+        except Exception as e:
+            return Response({'error': f'Bad CSV: {e}'}, status=400)
 
-        avgs = ds.summary.get('averages', {})
-        if avgs:
-            els.append(Paragraph("Parameter Averages", styles['Heading2']))
-            data = [['Parameter', 'Average']] + [[k, str(v)] for k, v in avgs.items()]
-            t = Table(data, colWidths=[2.5 * inch, 2 * inch])
-            t.setStyle(tbl_style)
-            els.append(t)
-            els.append(Spacer(1, 0.3 * inch))
+        names = table.schema.names
+        cols = request.query_params.get('columns')
+        cols = [c.strip() for c in cols.split(',') if c.strip()] if cols else None
+        ordering = request.query_params.get('ordering')
+        try:
+            filters = [parse_filter(f, names) for f in request.query_params.getlist('filter')]
+            if filters or ordering:
+                # only the columns the page, filters and ordering read are converted
+                wanted = (cols or names) + [f[0] for f in filters] + ([ordering.lstrip('-')] if ordering else [])
+                wanted = [c for c in dict.fromkeys(wanted) if c in names]
+                rows = query_rows(table.select(wanted).to_pandas(), cols, ordering, filters)
+                names = list(rows.columns)
+            else:
+                # unfiltered pages are sliced off the memory-mapped table
+                missing = [c for c in cols or () if c not in names]
+                if missing:
+                    raise ValueError(f'Unknown column: {missing[0]}')
+                rows = table.select(cols) if cols else table
+                names = rows.schema.names
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
 
-        dist = ds.summary.get('type_distribution', {})
-        if dist:
-            els.append(Paragraph("Type Distribution", styles['Heading2']))
-            data = [['Type', 'Count']] + [[k, str(v)] for k, v in dist.items()]
-            t = Table(data, colWidths=[2.5 * inch, 2 * inch])
-            t.setStyle(tbl_style)
-            els.append(t)
-
-        doc.build(els)
-        buf.seek(0)
-        resp = HttpResponse(buf, content_type='application/pdf')
-        resp['Content-Disposition'] = f'attachment; filename="report_{ds.id}.pdf"'
+        paginator = RowPagination()
+        if wants_binary(request):
+            page = paginator.paginate_frame(rows, request)
+        else:
+            page = paginator.paginate_queryset(FrameRecords(rows), request, view=self)
+        resp = paginator.get_paginated_response(page)
+        resp.data['columns'] = names
         return resp
 
+class CombinedStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Stats over several datasets by merging their stored sketches
+    def get(self, request):
+        try:
+            ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({'error': 'ids must be integers'}, status=400)
+        if not ids:
+            return Response({'error': 'Missing ids'}, status=400)
+
+        found = {ds.id: ds for ds in UploadedDataset.objects.filter(id__in=ids)}
+        missing = [i for i in ids if i not in found]
+        if missing:
+            return Response({'error': f'Not found: {missing}'}, status=404)
+
+        merged = SketchSet()
+        types = Counter()
+        for ds in found.values():
+            if not ds.sketches:
+                return Response({'error': f'Dataset {ds.id} has no sketches, run backfill_columnar'},
+                                status=409)
+            merged.merge(SketchSet.from_dict(ds.sketches))
+            types.update(ds.summary.get('type_distribution', {}))
+
+        out = merged.describe()
+        out['datasets'] = sorted(found)
+        out['total_count'] = sum(ds.row_count for ds in found.values())
+        out['type_distribution'] = dict(types.most_common())
+        return Response(out)
+
+class QueryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Filter / group-by / aggregate / pivot over one dataset from a JSON
+    # spec (see query.parse_query); results are memoized per query
+    def post(self, request):
+        spec = request.data
+        did = spec.get('id') if isinstance(spec, dict) else None
+        if not did:
+            return Response({'error': 'Missing id'}, status=400)
+        try:
+            ds = UploadedDataset.objects.get(id=did)
+        except (UploadedDataset.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Not found'}, status=404)
+        try:
+            query = parse_query(spec, load_table(ds).schema)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        key = query_key(ds, query)
+        result = cache.get(key)
+        hit = result is not None
+        if not hit:
+            try:
+                result = run_query(load_frame(ds, columns=query_columns(query)), query)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+            cache.set(key, result, settings.QUERY_CACHE_SECONDS)
+        return Response({**result, 'cached': hit})
+
+class SqlView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # One read-only SELECT across stored datasets (see sql.run_sql), e.g.
+    # {"sql": "SELECT Type, avg(Pressure) FROM all_rows WHERE dataset_id = ? GROUP BY 1",
+    #  "params": [3]}
+    def post(self, request):
+        if duckdb is None:
+            return Response({'error': 'SQL is not enabled on this server (install duckdb)'}, status=501)
+        spec = request.data if isinstance(request.data, dict) else {}
+        sql, params, ids = spec.get('sql'), spec.get('params'), spec.get('ids')
+        if not isinstance(sql, str) or not sql.strip():
+            return Response({'error': 'Missing sql'}, status=400)
+        if params is not None and not isinstance(params, (list, dict)):
+            return Response({'error': 'params must be a list or an object'}, status=400)
+        if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+            return Response({'error': 'ids must be a list of dataset ids'}, status=400)
+        try:
+            return Response(run_sql(sql, params, ids))
+        except SQLTimeout as e:
+            return Response({'error': str(e)}, status=408)
+        except SQLError as e:
+            return Response({'error': str(e)}, status=400)
+
+class SeriesView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = DATA_RENDERERS
+
+    MIN_POINTS, MAX_POINTS = 3, 5000
+
+    # One column downsampled to a pixel budget, optionally one series per Type
+    def get(self, request):
+        did = request.query_params.get('id')
+        col = request.query_params.get('column')
+        if not did or not col:
+            return Response({'error': 'Missing id or column'}, status=400)
+        method = request.query_params.get('method', 'lttb')
+        if method not in METHODS:
+            return Response({'error': f'method must be one of {", ".join(METHODS)}'}, status=400)
+        try:
+            points = int(request.query_params.get('points', 1000))
+        except ValueError:
+            return Response({'error': 'points must be an integer'}, status=400)
+        if points < self.MIN_POINTS:
+            return Response({'error': f'points must be at least {self.MIN_POINTS}'}, status=400)
+        points = min(points, self.MAX_POINTS)
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by != 'Type':
+            return Response({'error': 'group_by only supports Type'}, status=400)
+        try:
+            ds = UploadedDataset.objects.get(id=did)
+        except (UploadedDataset.DoesNotExist, ValueError):
+            return Response({'error': 'Not found'}, status=404)
+        return conditional_response(request, ds, lambda: self.build(request, ds, col, method, points, group_by))
+
+    def build(self, request, ds, col, method, points, group_by):
+        wanted = [col] + ([group_by] if group_by else [])
+        try:
+            df = load_frame(ds, columns=wanted)
+        except (KeyError, ValueError):
+            return Response({'error': f'Unknown column: {col}'}, status=400)
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            return Response({'error': f'{col} is not numeric'}, status=400)
+
+        y = df[col].to_numpy(dtype='float64')
+        groups = [(col, np.arange(len(y)))]
+        if group_by:
+            codes, names = pd.factorize(df[group_by], sort=True)
+            groups = [(str(name), np.flatnonzero(codes == i)) for i, name in enumerate(names)]
+
+        series = []
+        for name, rows in groups:
+            x, yy = downsample(y[rows], points, method)
+            series.append((name, rows[x], yy))
+        out = {'column': col, 'method': method, 'total': len(y)}
+        if wants_binary(request):
+            # one long table: series name, row index, value
+            names, xs, ys = zip(*series) if series else ((), [np.empty(0)], [np.empty(0)])
+            out['results'] = pd.DataFrame({
+                'series': pd.Categorical(np.repeat(names, [len(x) for x in xs]) if names else []),
+                'x': np.concatenate(xs).astype('int64'),
+                'y': np.concatenate(ys).astype('float64'),
+            })
+        else:
+            out['series'] = [{'name': n, 'x': x.tolist(), 'y': yy.tolist()} for n, x, yy in series]
+        return Response(out)
+
+class ReportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Serves the pre-rendered PDF report. The basic report is rendered
+    # inline if missing; the full one (?full=1) renders in the worker pool
+    # and the client retries on 202.
+    def get(self, request):
+        did = request.query_params.get('id')
+        if not did:
+            return Response({'error': 'Missing id'}, status=400)
+        try:
+            with span('db'):
+                ds = UploadedDataset.objects.get(id=did)
+        except (UploadedDataset.DoesNotExist, ValueError):
+            return Response({'error': 'Not found'}, status=404)
+        full = request.query_params.get('full') in ('1', 'true')
+        return conditional_response(request, ds, lambda: self.build(ds, full),
+                                    variant=f'report-v{REPORT_TEMPLATE_VERSION}')
+
+    def build(self, ds, full):
+        if full and not os.path.exists(report_path(ds, full=True)):
+            queue_report(ds.id, full=True)
+            resp = Response({'status': 'rendering'}, status=202)
+            resp['Retry-After'] = str(REPORT_RETRY_AFTER)
+            return resp
+        with span('pdf'):
+            path = ensure_report(ds, full)
+        name = f'report_{ds.id}_full.pdf' if full else f'report_{ds.id}.pdf'
+        return ranged_file_response(self.request, path, 'application/pdf', name)
+
+class MetricsView(APIView):
+    permission_classes = [AllowAny]
+
+    # Prometheus scrape target, counts are per process. Scrapers send
+    # METRICS_TOKEN as a bearer token; without one only staff users (or
+    # anyone, with DEBUG on) can read it
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if token:
+            allowed = constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+        else:
+            allowed = settings.DEBUG or request.user.is_staff
+        if not allowed:
+            return Response({'error': 'Not allowed'}, status=403)
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 class DeleteDatasetView(APIView):
     permission_classes = [IsAuthenticated]
 
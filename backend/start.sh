@@ -4,6 +4,9 @@ set -e
 echo "Running database migrations..."
 python manage.py migrate --noinput
 
+echo "Cleaning up uploads..."
+python manage.py cleanup_uploads --interrupted
+
 echo "Creating superuser if needed..."
 python manage.py shell -c "
 from django.contrib.auth import get_user_model
@@ -3,9 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from app_core.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('app_core.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
 # serve uploaded files in dev
@@ -0,0 +1,143 @@
+import requests
+from requests.adapters import HTTPAdapter
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from http_cache import HttpCache
+
+POOL_SIZE = 4
+
+
+# One request's signals. Lives on the GUI thread, so results emitted from the
+# worker are delivered there through queued connections.
+class _Call(QObject):
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, client, channel, generation, on_done, on_error, on_progress):
+        super().__init__()
+        self.client = client
+        self.channel = channel
+        self.generation = generation
+        self.task = None
+        self.on_done, self.on_error, self.on_progress = on_done, on_error, on_progress
+        self.done.connect(self._done)
+        self.failed.connect(self._failed)
+        self.progress.connect(self._progress)
+
+    def stale(self):
+        return self.channel is not None and self.client._generation.get(self.channel) != self.generation
+
+    def _finish(self):
+        self.client._calls.discard(self)
+        if self.channel is not None and self.client._queued.get(self.channel) is self.task:
+            del self.client._queued[self.channel]
+
+    @pyqtSlot(object)
+    def _done(self, result):
+        self._finish()
+        if not self.stale() and self.on_done:
+            self.on_done(result)
+
+    @pyqtSlot(str)
+    def _failed(self, msg):
+        self._finish()
+        if not self.stale() and self.on_error:
+            self.on_error(msg)
+
+    @pyqtSlot(int, int)
+    def _progress(self, done, total):
+        if not self.stale() and self.on_progress:
+            self.on_progress(done, total)
+
+
+class _Task(QRunnable):
+    def __init__(self, fn, call):
+        super().__init__()
+        self.fn = fn
+        self.call = call
+        # Python keeps ownership so a finished task can still be passed to tryTake
+        self.setAutoDelete(False)
+
+    def run(self):
+        if self.call.stale():
+            return
+        try:
+            result = self.fn(self.call.progress.emit)
+        except Exception as e:
+            self.call.failed.emit(str(e))
+        else:
+            self.call.done.emit(result)
+
+
+# Runs HTTP calls on a small thread pool over one keep-alive Session.
+# Callbacks run on the GUI thread. Calls made on the same channel replace each
+# other: a newer call drops the queued one and the older result is ignored
+# when it arrives.
+class ApiClient(QObject):
+    def __init__(self, base, parent=None):
+        super().__init__(parent)
+        self.base = base
+        self.token = None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.http = HttpCache(session=self.session)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(POOL_SIZE)
+        self._generation = {}
+        self._queued = {}
+        self._calls = set()
+
+    def headers(self):
+        return {"Authorization": f"Token {self.token}"} if self.token else {}
+
+    def cancel(self, channel):
+        self._generation[channel] = self._generation.get(channel, 0) + 1
+        task = self._queued.pop(channel, None)
+        if task is not None:
+            self.pool.tryTake(task)
+
+    # fn(progress) runs on a worker thread and must not touch widgets
+    def submit(self, fn, on_done=None, on_error=None, on_progress=None, channel=None):
+        gen = None
+        if channel is not None:
+            self.cancel(channel)
+            gen = self._generation[channel]
+        call = _Call(self, channel, gen, on_done, on_error, on_progress)
+        self._calls.add(call)
+        task = call.task = _Task(fn, call)
+        if channel is not None:
+            self._queued[channel] = task
+        self.pool.start(task)
+        return call
+
+    # cached: GETs go through the local cache and still work offline.
+    # instant: a cached copy is delivered right away and the revalidation
+    # in the background only calls on_done again if the body changed.
+    def request(self, method, path, on_done=None, on_error=None, channel=None,
+                cached=False, instant=False, timeout=10, **kwargs):
+        url = f"{self.base}{path}"
+        headers = {**self.headers(), **kwargs.pop('headers', {})}
+
+        def fn(progress):
+            if cached and method == 'GET':
+                return self.http.get(url, params=kwargs.get('params'), headers=headers, timeout=timeout)
+            return self.session.request(method, url, headers=headers, timeout=timeout, **kwargs)
+
+        hit = self.http.lookup(url, kwargs.get('params')) if cached and instant else None
+        if hit is None:
+            return self.submit(fn, on_done, on_error, channel=channel)
+        call = self.submit(fn, lambda r: r.from_cache or on_done(r), channel=channel)
+        on_done(hit)
+        return call
+
+    def get(self, path, on_done=None, **kwargs):
+        return self.request('GET', path, on_done, **kwargs)
+
+    def post(self, path, on_done=None, **kwargs):
+        return self.request('POST', path, on_done, **kwargs)
+
+    def delete(self, path, on_done=None, **kwargs):
+        return self.request('DELETE', path, on_done, **kwargs)
@@ -1,15 +1,20 @@
+import os
 import sys
 import requests
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFileDialog, QMessageBox, QLabel, QSplitter, QComboBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from components.auth_dialog import AuthDialog
 from components.table_view import TableView
 from components.chart_view import ChartView
+from api_client import ApiClient
+from formats import TABLE_ACCEPT, decode_table
 
 API = "http://localhost:8000/api"
+JOB_POLL_MS = 500
+CHUNK_RETRIES = 3
 
 
 # Custom dark theme stylesheet
@@ -34,7 +39,7 @@ QPushButton#deleteBtn { background: #dc2626; }
 QPushButton#deleteBtn:hover { background: #b91c1c; }
 QPushButton#logoutBtn { background: #525252; }
 QPushButton#logoutBtn:hover { background: #404040; }
-QTableWidget { 
+QTableWidget, QTableView { 
     background: #171717; 
     color: #fafafa; 
     gridline-color: #333; 
@@ -74,6 +79,10 @@ class MainWindow(QMainWindow):
         self.token = None
         self.current_id = None
         self.history = []
+        self.job_id = None
+        self.client = ApiClient(API, self)
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self._poll_job)
         self.setWindowTitle("CSV Visualizer - Python (PyQt5)")
         self.setMinimumSize(1100, 700)
         self._build_ui()
@@ -143,12 +152,13 @@ class MainWindow(QMainWindow):
 
     def _login(self):
         # Opens authentication dialog
-        dlg = AuthDialog(API, self)
+        dlg = AuthDialog(self.client, self)
         if dlg.exec_() == AuthDialog.Accepted and dlg.token:
             self.token = dlg.token
+            self.client.token = dlg.token
             self.status.setText("Logged in")
             self.logout_btn.setEnabled(True)
-            self._load_history()
+            self._load_history(instant=True)
         else:
             self.status.setText("Not authenticated")
 
@@ -156,7 +166,11 @@ class MainWindow(QMainWindow):
         reply = QMessageBox.question(self, 'Logout', 'Are you sure you want to logout?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
+            for channel in ("history", "dataset", "rows", "job"):
+                self.client.cancel(channel)
+            self._finish_job()
             self.token = None
+            self.client.token = None
             self.current_id = None
             self.history = []
             self.dataset_combo.clear()
@@ -165,39 +179,40 @@ class MainWindow(QMainWindow):
             self.pdf_btn.setEnabled(False)
             self.delete_btn.setEnabled(False)
             self.logout_btn.setEnabled(False)
-            self.table_view.load_rows([])
-            self.chart_view.figure.clear()
-            self.chart_view.canvas.draw()
+            self.table_view.clear()
+            self.chart_view.clear()
             self.status.setText("Logged out")
             self._login()
 
-    def _headers(self):
-        return {"Authorization": f"Token {self.token}"}
-
-    def _load_history(self):
+    def _load_history(self, select_id=None, instant=False):
         if not self.token:
             return
-        try:
-            r = requests.get(f"{API}/history/", headers=self._headers(), timeout=10)
-            if r.status_code == 200:
-                self.history = r.json()
-                self.dataset_combo.blockSignals(True)
-                self.dataset_combo.clear()
-                self.dataset_combo.blockSignals(False)
-                
-                if self.history:
-                    for ds in self.history:
-                        self.dataset_combo.addItem(f"{ds['name']} ({ds['row_count']} rows)", ds['id'])
-                    self.dataset_combo.setEnabled(True)
-                    self.dataset_combo.setCurrentIndex(0) # Select first by default
-                else:
-                    self.dataset_combo.addItem("No datasets")
-                    self.dataset_combo.setEnabled(False)
-                    self.current_id = None
-                    self.delete_btn.setEnabled(False)
-                    self.pdf_btn.setEnabled(False)
-        except Exception as e:
-            print(f"Failed to load history: {e}")
+        self.client.get("/history/", lambda r: self._on_history(r, select_id), channel="history",
+                        cached=True, instant=instant,
+                        on_error=lambda msg: print(f"Failed to load history: {msg}"))
+
+    def _on_history(self, r, select_id=None):
+        if r.status_code != 200:
+            return
+        self.history = r.json()
+        self.dataset_combo.blockSignals(True)
+        self.dataset_combo.clear()
+        self.dataset_combo.blockSignals(False)
+
+        if self.history:
+            for ds in self.history:
+                self.dataset_combo.addItem(f"{ds['name']} ({ds['row_count']} rows)", ds['id'])
+            self.dataset_combo.setEnabled(True)
+            # keep the current selection when a refreshed list comes in
+            select_id = select_id or self.current_id
+            index = self.dataset_combo.findData(select_id) if select_id else -1
+            self.dataset_combo.setCurrentIndex(max(index, 0))  # Select first by default
+        else:
+            self.dataset_combo.addItem("No datasets")
+            self.dataset_combo.setEnabled(False)
+            self.current_id = None
+            self.delete_btn.setEnabled(False)
+            self.pdf_btn.setEnabled(False)
 
     def _on_dataset_selected(self, index):
         if index >= 0 and self.dataset_combo.count() > 0:
@@ -217,26 +232,90 @@ class MainWindow(QMainWindow):
         if not path:
             return
         self.status.setText("Uploading...")
-        QApplication.processEvents()
-        try:
-            with open(path, 'rb') as f:
-                r = requests.post(f"{API}/upload/", files={"file": f}, headers=self._headers(), timeout=30)
-            if r.status_code == 201:
-                data = r.json()
-                self.status.setText(f"Uploaded: {data['name']}")
-                self._load_history()
-                # Select the new item
-                count = self.dataset_combo.count()
-                for i in range(count):
-                    if self.dataset_combo.itemData(i) == data['id']:
-                        self.dataset_combo.setCurrentIndex(i)
-                        break
-            else:
-                QMessageBox.warning(self, "Failed", r.json().get('error', 'Error'))
-                self.status.setText("Upload failed")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
-            self.status.setText("Upload error")
+        self.upload_btn.setEnabled(False)
+        self.client.submit(lambda progress: self._send_chunks(path, progress),
+                           on_done=self._on_uploaded, on_error=self._on_upload_error,
+                           on_progress=self._on_upload_progress)
+
+    def _on_upload_progress(self, done, size):
+        self.status.setText(f"Uploading... {done * 100 // max(size, 1)}%")
+
+    def _on_uploaded(self, r):
+        if r.status_code == 202:
+            # parsing runs on the server, poll the job until it finishes
+            self.job_id = r.json()['id']
+            self.status.setText("Processing... 0%")
+            self.job_timer.start(JOB_POLL_MS)
+        elif r.status_code == 201:
+            # the server already had this file, the job comes back finished
+            self._on_job(r)
+        else:
+            self.upload_btn.setEnabled(True)
+            QMessageBox.warning(self, "Failed", r.json().get('error', 'Error'))
+            self.status.setText("Upload failed")
+
+    def _on_upload_error(self, msg):
+        self.upload_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", msg)
+        self.status.setText("Upload error")
+
+    def _send_chunks(self, path, progress):
+        # Resumable upload: init, PUT each chunk, finalize. A failed chunk
+        # asks the server where to resume instead of starting over.
+        # Runs on a worker thread, progress(done, size) reports back.
+        session, headers = self.client.session, self.client.headers()
+        size = os.path.getsize(path)
+        r = session.post(f"{API}/uploads/", json={"name": os.path.basename(path), "size": size},
+                         headers=headers, timeout=10)
+        if r.status_code != 201:
+            return r
+        sess = r.json()
+        url = f"{API}/uploads/{sess['id']}"
+        with open(path, 'rb') as f:
+            n, failures = sess['next_chunk'], 0
+            while n * sess['chunk_size'] < size:
+                f.seek(n * sess['chunk_size'])
+                try:
+                    r = session.put(f"{url}/chunks/{n}/", data=f.read(sess['chunk_size']),
+                                    headers=headers, timeout=30)
+                    r.raise_for_status()
+                    n, failures = r.json()['next_chunk'], 0
+                except requests.RequestException:
+                    failures += 1
+                    if failures > CHUNK_RETRIES:
+                        raise
+                    n = session.get(f"{url}/", headers=headers, timeout=10).json()['next_chunk']
+                progress(min(n * sess['chunk_size'], size), size)
+        return session.post(f"{url}/finalize/", headers=headers, timeout=30)
+
+    def _poll_job(self):
+        self.client.get(f"/jobs/{self.job_id}/", self._on_job, channel="job",
+                        on_error=self._on_job_error)
+
+    def _on_job(self, r):
+        job = r.json()
+        if job.get('status') == 'done':
+            self._finish_job()
+            data = job['dataset']
+            self.status.setText(f"Uploaded: {data['name']}")
+            # Select the new item once history is back
+            self._load_history(select_id=data['id'])
+        elif job.get('status') == 'failed':
+            self._finish_job()
+            QMessageBox.warning(self, "Failed", job.get('error') or 'Error')
+            self.status.setText("Upload failed")
+        else:
+            self.status.setText(f"Processing... {job.get('progress', 0)}%")
+
+    def _on_job_error(self, msg):
+        self._finish_job()
+        QMessageBox.critical(self, "Error", msg)
+        self.status.setText("Upload error")
+
+    def _finish_job(self):
+        self.job_timer.stop()
+        self.job_id = None
+        self.upload_btn.setEnabled(True)
 
     def _delete_dataset(self):
         # Deletes the currently selected dataset
@@ -245,29 +324,53 @@ class MainWindow(QMainWindow):
         reply = QMessageBox.question(self, 'Delete', 'Are you sure you want to delete this dataset?',
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            try:
-                r = requests.delete(f"{API}/delete/{self.current_id}/", headers=self._headers(), timeout=10)
-                if r.status_code == 200:
-                    self.status.setText("Dataset deleted")
-                    self.table_view.load_rows([])
-                    self.chart_view.figure.clear()
-                    self.chart_view.canvas.draw()
-                    self._load_history()
-                else:
-                    QMessageBox.warning(self, "Error", "Failed to delete dataset")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+            self.client.delete(f"/delete/{self.current_id}/", self._on_deleted,
+                               on_error=lambda msg: QMessageBox.critical(self, "Error", msg))
+
+    def _on_deleted(self, r):
+        if r.status_code == 200:
+            self.status.setText("Dataset deleted")
+            self.client.cancel("dataset")
+            self.client.http.forget(self.current_id)
+            self.table_view.clear()
+            self.chart_view.clear()
+            self._load_history()
+        else:
+            QMessageBox.warning(self, "Error", "Failed to delete dataset")
 
     def _load_data(self, did):
-        try:
-            r = requests.get(f"{API}/chart-data/?id={did}", headers=self._headers(), timeout=10)
+        # a newer selection on the "dataset" channel drops this one; a copy
+        # from the local cache shows at once while the server is asked
+        self.status.setText(f"Loading dataset #{did}...")
+        self.client.get("/chart-data/", lambda r: self._on_chart_data(did, r), channel="dataset",
+                        cached=True, instant=True, params={"id": did},
+                        on_error=lambda msg: QMessageBox.warning(self, "Error", msg))
+
+    def _on_chart_data(self, did, r):
+        if r.status_code == 200:
+            self.chart_view.draw_charts(r.json())
+            # the table pulls its own pages from /rows/ as it scrolls
+            self.table_view.set_source(lambda offset, limit, ordering, on_page, on_error:
+                                       self._fetch_rows(did, offset, limit, ordering, on_page, on_error))
+            self.status.setText(f"Loaded dataset #{did}" + (" (offline)" if r.offline else ""))
+
+    def _fetch_rows(self, did, offset, limit, ordering, on_page, on_error):
+        params = {"id": did, "offset": offset, "limit": limit}
+        if ordering:
+            params["ordering"] = ordering
+
+        # a failed page clears the table's pending request and says why in the status bar
+        def failed(msg):
+            on_error(msg)
+            self.status.setText(f"Failed to load rows: {msg}")
+
+        def done(r):
             if r.status_code == 200:
-                d = r.json()
-                self.table_view.load_rows(d.get('rows', []))
-                self.chart_view.draw_charts(d)
-                self.status.setText(f"Loaded dataset #{did}")
-        except Exception as e:
-            QMessageBox.warning(self, "Error", str(e))
+                on_page(decode_table(r))
+            else:
+                failed(f"server returned {r.status_code}")
+        self.client.get("/rows/", done, channel="rows", cached=True, params=params,
+                        headers={"Accept": TABLE_ACCEPT}, on_error=failed)
 
     def _download_pdf(self):
         if not self.current_id:
@@ -275,16 +378,31 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getSaveFileName(self, "Save PDF", f"report_{self.current_id}.pdf", "PDF (*.pdf)")
         if not path:
             return
-        try:
-            r = requests.get(f"{API}/report/?id={self.current_id}", headers=self._headers(), timeout=15)
-            if r.status_code == 200:
-                with open(path, 'wb') as f:
-                    f.write(r.content)
-                QMessageBox.information(self, "Done", f"Saved to {path}")
-            else:
-                QMessageBox.warning(self, "Error", "Failed to get report")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.pdf_btn.setEnabled(False)
+        self._fetch_report(self.current_id, path)
+
+    def _fetch_report(self, did, path):
+        self.client.get("/report/", lambda r: self._on_report(r, did, path), cached=True, timeout=15,
+                        params={"id": did}, on_error=self._on_report_error)
+
+    def _on_report(self, r, did, path):
+        if r.status_code == 202:
+            # still rendering on the server, ask again when it says to
+            self.status.setText("Rendering report...")
+            delay = int(r.headers.get('Retry-After', 5)) * 1000
+            QTimer.singleShot(delay, lambda: self._fetch_report(did, path))
+            return
+        self.pdf_btn.setEnabled(self.current_id is not None)
+        if r.status_code == 200:
+            with open(path, 'wb') as f:
+                f.write(r.content)
+            QMessageBox.information(self, "Done", f"Saved to {path}")
+        else:
+            QMessageBox.warning(self, "Error", "Failed to get report")
+
+    def _on_report_error(self, msg):
+        self.pdf_btn.setEnabled(self.current_id is not None)
+        QMessageBox.critical(self, "Error", msg)
 
 
 if __name__ == '__main__':
@@ -1,10 +1,9 @@
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-import requests
 
 class AuthDialog(QDialog):
-    def __init__(self, api_base, parent=None):
+    def __init__(self, client, parent=None):
         super().__init__(parent)
-        self.api_base = api_base
+        self.client = client
         self.token = None
         self.setWindowTitle("Login")
         self.setFixedSize(300, 180)
@@ -21,9 +20,9 @@ class AuthDialog(QDialog):
         self.pass_input.setEchoMode(QLineEdit.Password)
         layout.addWidget(self.pass_input)
 
-        btn = QPushButton("Login")
-        btn.clicked.connect(self._login)
-        layout.addWidget(btn)
+        self.btn = QPushButton("Login")
+        self.btn.clicked.connect(self._login)
+        layout.addWidget(self.btn)
         self.setLayout(layout)
 
     def _login(self):
@@ -32,12 +31,18 @@ class AuthDialog(QDialog):
         if not u or not p:
             QMessageBox.warning(self, "Error", "Fill both fields")
             return
-        try:
-            r = requests.post(f"{self.api_base}/auth/token/", json={"username": u, "password": p}, timeout=10)
-            if r.status_code == 200:
-                self.token = r.json().get("token")
-                self.accept()
-            else:
-                QMessageBox.warning(self, "Failed", "Bad credentials")
-        except requests.RequestException as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.btn.setEnabled(False)
+        self.client.post("/auth/token/", self._on_reply, on_error=self._on_error,
+                         channel="login", json={"username": u, "password": p})
+
+    def _on_reply(self, r):
+        self.btn.setEnabled(True)
+        if r.status_code == 200:
+            self.token = r.json().get("token")
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Failed", "Bad credentials")
+
+    def _on_error(self, msg):
+        self.btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", msg)
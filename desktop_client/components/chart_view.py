@@ -1,94 +1,181 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch, Rectangle
+from matplotlib.path import Path
 import matplotlib.pyplot as plt
 import numpy as np
 
+BG = '#0a0a0a'
+BAR_WIDTH = 0.6
+
+
+# Rounds an axis limit up to a round number so similar datasets share
+# limits (and tick labels) and can be redrawn by blitting
+def nice_limit(value):
+    if not value or value <= 0:
+        return 10
+    step = 10 ** np.floor(np.log10(value))
+    for m in (1, 1.5, 2, 2.5, 3, 4, 5, 6, 8, 10):
+        if value <= m * step:
+            return float(m * step)
+
+
+# Type distribution bars and a radar of parameter averages. The axes and
+# artists are built once. A dataset switch only updates their data in place;
+# when the limits and tick labels stay the same the frame is redrawn by
+# blitting the data artists over a cached background instead of re-rendering
+# the whole figure.
 class ChartView(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.figure = Figure(figsize=(11, 5.5), facecolor='#0a0a0a', dpi=100)
+        self.figure = Figure(figsize=(11, 5.5), facecolor=BG, dpi=100)
         self.canvas = FigureCanvas(self.figure)
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
         layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
+        self.bars, self.bar_labels = [], []
+        self.layout_key = None
+        self.background = None
+        self._build_axes()
+        self.canvas.mpl_connect('draw_event', self._on_draw)
 
-    def draw_charts(self, data):
-        self.figure.clear()
-        labels = data.get('labels', [])
-        counts = data.get('counts', [])
-        avgs = data.get('averages', {})
-
-        ax1 = self.figure.add_subplot(1, 2, 1, facecolor='#0a0a0a')
-        
-        x_pos = np.arange(len(labels))
-        colors = plt.cm.RdYlBu_r(np.linspace(0.3, 0.8, len(labels)))
-        
-        bars = ax1.bar(x_pos, counts, color=colors, edgecolor='#60a5fa', 
-                       linewidth=2.5, alpha=0.9, width=0.6)
-        
-        for idx, (bar, count) in enumerate(zip(bars, counts)):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + max(counts)*0.02,
-                    f'{int(height)}',
-                    ha='center', va='bottom', color='#60a5fa', 
-                    fontsize=11, fontweight='bold')
-            
-            gradient = plt.cm.Blues(np.linspace(0.4, 0.9, 100))
-            for i in range(100):
-                h = height * i / 100
-                ax1.barh(h, bar.get_width(), left=bar.get_x(), 
-                        height=height/100, color=gradient[i], 
-                        alpha=0.1, zorder=0)
-        
-        ax1.set_title('Equipment Type Distribution', 
-                     color='#fafafa', fontsize=14, fontweight='bold', pad=20)
+    def _build_axes(self):
+        ax1 = self.ax1 = self.figure.add_subplot(1, 2, 1, facecolor=BG)
+        ax1.set_title('Equipment Type Distribution',
+                      color='#fafafa', fontsize=14, fontweight='bold', pad=20)
         ax1.set_xlabel('Equipment Type', color='#a3a3a3', fontsize=11, fontweight='500')
         ax1.set_ylabel('Count', color='#a3a3a3', fontsize=11, fontweight='500')
-        ax1.set_xticks(x_pos)
-        ax1.set_xticklabels(labels, rotation=15, ha='right')
         ax1.tick_params(colors='#a3a3a3', labelsize=10)
         ax1.grid(True, alpha=0.15, linestyle='--', linewidth=0.8, axis='y')
-        ax1.set_ylim(0, max(counts) * 1.15 if counts else 10)
-        
         for spine in ax1.spines.values():
             spine.set_color('#262626')
             spine.set_linewidth(2)
-        
-        ax2 = self.figure.add_subplot(1, 2, 2, projection='polar', facecolor='#0a0a0a')
-        
-        param_names = list(avgs.keys())
-        param_values = list(avgs.values())
-        
-        if param_names and param_values:
-            N = len(param_names)
-            angles = np.linspace(0, 2 * np.pi, N, endpoint=False).tolist()
-            param_values_plot = param_values + [param_values[0]]
-            angles_plot = angles + [angles[0]]
-            
-            ax2.plot(angles_plot, param_values_plot, 'o-', linewidth=3, 
-                    color='#60a5fa', markersize=10, markerfacecolor='#3b82f6',
-                    markeredgecolor='#fafafa', markeredgewidth=2, zorder=3)
-            
-            ax2.fill(angles_plot, param_values_plot, alpha=0.25, color='#3b82f6')
-            ax2.fill(angles_plot, param_values_plot, alpha=0.15, color='#60a5fa')
-            
-            for angle, value, name in zip(angles, param_values, param_names):
-                ax2.plot([angle, angle], [0, value], color='#262626', 
-                        linewidth=1, alpha=0.3, linestyle='--')
-            
-            ax2.set_xticks(angles)
-            ax2.set_xticklabels(param_names, color='#fafafa', fontsize=10, fontweight='500')
-            ax2.tick_params(colors='#a3a3a3', labelsize=9, pad=10)
-            ax2.set_title('Parameter Averages (Radar)', 
-                         color='#fafafa', fontsize=14, fontweight='bold', y=1.1, pad=20)
-            
-            ax2.grid(True, alpha=0.25, linestyle='-', linewidth=1, color='#444')
-            ax2.set_ylim(0, max(param_values) * 1.2 if param_values else 10)
-            
-            ax2.spines['polar'].set_color('#262626')
-            ax2.spines['polar'].set_linewidth(2)
-
-        self.figure.tight_layout(pad=3.0)
+
+        # one image holds the gradient behind every bar, clipped to their outline
+        self.gradient = ax1.imshow(np.linspace(0.4, 0.9, 256)[:, None], cmap='Blues',
+                                   vmin=0, vmax=1, origin='lower', aspect='auto',
+                                   extent=(0, 1, 0, 1), alpha=0.1, zorder=0, animated=True)
+        self.gradient_clip = PathPatch(Path(np.zeros((1, 2))), transform=ax1.transData)
+        self.gradient.set_clip_path(self.gradient_clip)
+
+        ax2 = self.ax2 = self.figure.add_subplot(1, 2, 2, projection='polar', facecolor=BG)
+        ax2.set_title('Parameter Averages (Radar)',
+                      color='#fafafa', fontsize=14, fontweight='bold', y=1.1, pad=20)
+        ax2.tick_params(colors='#a3a3a3', labelsize=9, pad=10)
+        ax2.grid(True, alpha=0.25, linestyle='-', linewidth=1, color='#444')
+        ax2.spines['polar'].set_color('#262626')
+        ax2.spines['polar'].set_linewidth(2)
+        # all spokes live in one line, separated by NaNs
+        self.spokes, = ax2.plot([], [], color='#262626', linewidth=1, alpha=0.3,
+                                linestyle='--', animated=True)
+        self.fills = [ax2.fill([0], [0], alpha=0.25, color='#3b82f6', animated=True)[0],
+                      ax2.fill([0], [0], alpha=0.15, color='#60a5fa', animated=True)[0]]
+        self.radar, = ax2.plot([], [], 'o-', linewidth=3, color='#60a5fa', markersize=10,
+                               markerfacecolor='#3b82f6', markeredgecolor='#fafafa',
+                               markeredgewidth=2, zorder=3, animated=True)
+        # fixed margins: tight_layout on every switch costs as much as the draw
+        self.figure.subplots_adjust(left=0.07, right=0.95, bottom=0.2, top=0.82, wspace=0.35)
+
+    def _ensure_bars(self, n):
+        while len(self.bars) < n:
+            self.bars.append(self.ax1.add_patch(Rectangle(
+                (0, 0), BAR_WIDTH, 0, edgecolor='#60a5fa', linewidth=2.5, alpha=0.9, animated=True)))
+            self.bar_labels.append(self.ax1.text(
+                0, 0, '', ha='center', va='bottom', color='#60a5fa',
+                fontsize=11, fontweight='bold', animated=True))
+
+    def _animated(self):
+        return [self.gradient, *self.bars, *self.bar_labels, self.spokes, *self.fills, self.radar]
+
+    def draw_charts(self, data):
+        labels = data.get('labels', [])
+        counts = data.get('counts', [])
+        avgs = data.get('averages', {})
+        names = [k for k, v in avgs.items() if v is not None]
+        values = [avgs[k] for k in names]
+
+        top = max(counts) if counts else 0
+        ylim1 = nice_limit(top * 1.15)
+        ylim2 = nice_limit(max(values) * 1.2 if values else 0)
+        key = (tuple(labels), ylim1, tuple(names), ylim2)
+
+        self._update_bars(labels, counts, top)
+        self._update_radar(names, values)
+
+        if key == self.layout_key and self.background is not None:
+            self._blit()
+            return
+        # limits or tick labels changed: re-render the static parts once
+        self.layout_key = key
+        x_pos = np.arange(len(labels))
+        self.ax1.set_visible(True)
+        self.ax2.set_visible(True)
+        self.ax1.set_xticks(x_pos)
+        self.ax1.set_xticklabels(labels, rotation=15, ha='right')
+        self.ax1.set_xlim(-0.5, max(len(labels), 1) - 0.5)
+        self.ax1.set_ylim(0, ylim1)
+        self.gradient.set_extent((-0.5, max(len(labels), 1) - 0.5, 0, ylim1))
+        angles = np.linspace(0, 2 * np.pi, len(names), endpoint=False)
+        self.ax2.set_xticks(angles)
+        self.ax2.set_xticklabels(names, color='#fafafa', fontsize=10, fontweight='500')
+        self.ax2.set_ylim(0, ylim2)
+        self.canvas.draw()
+
+    def _update_bars(self, labels, counts, top):
+        n = len(labels)
+        self._ensure_bars(n)
+        colors = plt.cm.RdYlBu_r(np.linspace(0.3, 0.8, n))
+        rects = []
+        for i, (bar, text) in enumerate(zip(self.bars, self.bar_labels)):
+            visible = i < n
+            bar.set_visible(visible)
+            text.set_visible(visible)
+            if not visible:
+                continue
+            x, height = i - BAR_WIDTH / 2, counts[i]
+            bar.set_x(x)
+            bar.set_height(height)
+            bar.set_facecolor(colors[i])
+            text.set_position((i, height + top * 0.02))
+            text.set_text(f'{int(height)}')
+            rects.append(Path.unit_rectangle().transformed(
+                bar.get_patch_transform()))
+        self.gradient.set_visible(bool(rects))
+        if rects:
+            self.gradient_clip.set_path(Path.make_compound_path(*rects))
+
+    def _update_radar(self, names, values):
+        angles = np.linspace(0, 2 * np.pi, len(names), endpoint=False)
+        closed_a, closed_v = np.append(angles, angles[:1]), np.append(values, values[:1])
+        self.radar.set_data(closed_a, closed_v)
+        for fill in self.fills:
+            fill.set_xy(np.column_stack([closed_a, closed_v]) if len(names) else np.zeros((1, 2)))
+        spoke_a = np.repeat(angles, 3)
+        spoke_v = np.tile([0.0, 0.0, np.nan], len(names))
+        spoke_v[1::3] = values
+        spoke_a[2::3] = np.nan
+        self.spokes.set_data(spoke_a, spoke_v)
+
+    def _on_draw(self, event):
+        # a full draw skips the animated artists: keep it as the background
+        # and put the data back on top
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self._animated():
+            if artist.get_visible() and artist.axes.get_visible():
+                self.figure.draw_artist(artist)
+
+    def _blit(self):
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.figure.bbox)
+
+    def clear(self):
+        self.layout_key = None
+        self.ax1.set_visible(False)
+        self.ax2.set_visible(False)
         self.canvas.draw()
@@ -1,4 +1,128 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTableView, QHeaderView
+
+PAGE_SIZE = 500
+
+
+def _page_len(cols):
+    return len(next(iter(cols.values()), ()))
+
+
+# Table rows kept as one NumPy array per column and per page. Pages come from
+# fetch_page(offset, limit, ordering, on_page, on_error), which requests the
+# /rows/ payload and hands it to on_page once it arrives, with 'results'
+# already decoded into column arrays, or a message to on_error if it fails.
+# After a failure no more pages are asked for until the source or the ordering
+# changes. Qt asks for more through canFetchMore/fetchMore as the view
+# scrolls, so only the pages the user has reached are ever loaded. Sorting is
+# done on the server by re-fetching with an ordering.
+class RowModel(QAbstractTableModel):
+    def __init__(self, fetch_page=None, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self._reset_state(fetch_page)
+
+    def _reset_state(self, fetch_page):
+        self.fetch_page = fetch_page
+        self.ordering = None
+        self.columns = []
+        self.pages = []  # list of {column: np.ndarray}
+        self.loaded = 0
+        self.total = 0
+        self.pending = False
+        self.failed = False
+        # bumped on every reset so late pages from an old source are dropped
+        self.generation = getattr(self, 'generation', 0) + 1
+
+    def set_source(self, fetch_page):
+        self.beginResetModel()
+        self._reset_state(fetch_page)
+        self.endResetModel()
+        if fetch_page:
+            self._load_first()
+
+    def _request(self, offset, handler):
+        gen = self.generation
+        self.pending = True
+
+        def on_page(page):
+            if gen == self.generation:
+                self.pending = False
+                handler(page)
+
+        def on_error(msg):
+            if gen == self.generation:
+                self.pending = False
+                self.failed = True
+        self.fetch_page(offset, self.page_size, self.ordering, on_page, on_error)
+
+    def _load_first(self):
+        self._request(0, self._first_page)
+
+    def _first_page(self, page):
+        self.beginResetModel()
+        self.columns = page.get('columns', [])
+        self.total = page.get('count', 0)
+        self.pages = []
+        self.loaded = 0
+        self._append(page.get('results', {}))
+        self.endResetModel()
+
+    # cols is {column: np.ndarray} for one page
+    def _append(self, cols):
+        n = _page_len(cols)
+        if n:
+            self.pages.append(cols)
+            self.loaded += n
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        page, i = divmod(index.row(), self.page_size)
+        v = self.pages[page][self.columns[index.column()]][i]
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            return ''
+        return f'{v:g}' if isinstance(v, float) else str(v)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section] if section < len(self.columns) else None
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.pending and not self.failed and self.loaded < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        self._request(self.loaded, self._more_rows)
+
+    def _more_rows(self, page):
+        cols = page.get('results', {})
+        n = _page_len(cols)
+        if not n:
+            self.total = self.loaded
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + n - 1)
+        self._append(cols)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not self.fetch_page or not (0 <= column < len(self.columns)):
+            return
+        name = self.columns[column]
+        self.ordering = name if order == Qt.AscendingOrder else f'-{name}'
+        self.generation += 1
+        self.failed = False
+        self._load_first()
+
 
 class TableView(QWidget):
     def __init__(self, parent=None):
@@ -7,19 +131,27 @@ class TableView(QWidget):
         self.label = QLabel("Equipment Data")
         self.label.setStyleSheet("font-size: 14px; font-weight: bold;")
         layout.addWidget(self.label)
-        self.table = QTableWidget()
+        self.model = RowModel()
+        self.model.modelReset.connect(self._update_label)
+        self.model.rowsInserted.connect(self._update_label)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
         layout.addWidget(self.table)
         self.setLayout(layout)
 
-    def load_rows(self, rows):
-        if not rows:
-            self.table.setRowCount(0)
-            return
-        cols = list(rows[0].keys())
-        self.table.setColumnCount(len(cols))
-        self.table.setHorizontalHeaderLabels(cols)
-        self.table.setRowCount(len(rows))
-        for i, row in enumerate(rows):
-            for j, col in enumerate(cols):
-                self.table.setItem(i, j, QTableWidgetItem(str(row.get(col, ''))))
-        self.table.resizeColumnsToContents()
+    # fetch_page(offset, limit, ordering, on_page, on_error) delivers a /rows/ payload
+    def set_source(self, fetch_page):
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.model.set_source(fetch_page)
+
+    def clear(self):
+        self.set_source(None)
+
+    def _update_label(self, *args):
+        if self.model.total:
+            self.label.setText(f"Equipment Data ({self.model.loaded} of {self.model.total} rows)")
+        else:
+            self.label.setText("Equipment Data")
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # without pyarrow the client asks for JSON
+    pa = None
+
+ARROW = 'application/vnd.apache.arrow.stream'
+# Accept header for table endpoints (/rows/, /series/); DRF ignores q
+# values, so only list the one format wanted
+TABLE_ACCEPT = ARROW if pa else 'application/json'
+
+
+def _column(values):
+    try:
+        return np.array(values, dtype='float64')
+    except (TypeError, ValueError):
+        return np.array(values, dtype=object)
+
+
+# Table payload with 'results' as {column: np.ndarray}. Arrow streams decode
+# column by column into NumPy with no per-row Python objects for numeric data;
+# JSON records are turned into the same column arrays.
+def decode_table(r):
+    if r.headers.get('Content-Type', '').startswith(ARROW):
+        table = pa.ipc.open_stream(r.content).read_all()
+        payload = json.loads(table.schema.metadata[b'meta'])
+        payload['results'] = {name: table.column(name).to_numpy() for name in table.column_names}
+        return payload
+    payload = r.json()
+    rows = payload.get('results', [])
+    payload['results'] = {c: _column([row.get(c) for row in rows]) for c in payload.get('columns', [])}
+    return payload
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'csv_visualizer')
+MAX_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    dataset_id INTEGER,
+    etag TEXT,
+    content_type TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+CREATE INDEX IF NOT EXISTS responses_dataset ON responses (dataset_id);
+"""
+
+
+# Persistent cache of GET responses in a SQLite file. Entries are keyed by URL
+# and remember the dataset id and ETag they belong to. Cached entries are
+# revalidated with If-None-Match, and a 304 is turned back into a 200 with the
+# stored body. When the server cannot be reached the stored copy is returned,
+# so datasets seen before still open offline. The least recently used entries
+# go once the total size passes max_bytes.
+class HttpCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, session=None):
+        self.session = session or requests.Session()
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        # gets may run on several worker threads at once
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, 'cache.sqlite3'), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+
+    def _response(self, url, row, offline=False):
+        etag, content_type, body = row
+        r = requests.Response()
+        r.status_code = 200
+        r.url = url
+        r._content = body
+        r.headers['Content-Type'] = content_type or ''
+        if etag:
+            r.headers['ETag'] = etag
+        r.from_cache = True
+        r.offline = offline
+        return r
+
+    def _row(self, url):
+        return self.db.execute('SELECT etag, content_type, body FROM responses WHERE url = ?',
+                               (url,)).fetchone()
+
+    # Stored copy for a URL without going to the network, or None
+    def lookup(self, url, params=None):
+        full = requests.Request('GET', url, params=params).prepare().url
+        with self.lock, self.db:
+            row = self._row(full)
+            if row is None:
+                return None
+            self.db.execute('UPDATE responses SET used = ? WHERE url = ?', (time.time(), full))
+        return self._response(full, row)
+
+    def get(self, url, params=None, headers=None, timeout=10):
+        full = requests.Request('GET', url, params=params).prepare().url
+        headers = dict(headers or {})
+        with self.lock:
+            row = self._row(full)
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+
+        try:
+            r = self.session.get(full, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if row is None:
+                raise
+            return self._response(full, row, offline=True)
+
+        r.from_cache, r.offline = False, False
+        if r.status_code == 304 and row:
+            with self.lock, self.db:
+                self.db.execute('UPDATE responses SET used = ? WHERE url = ?', (time.time(), full))
+            return self._response(full, row)
+        if r.status_code == 200:
+            if row and row[2] == r.content:
+                r.from_cache = True
+            dataset_id = (params or {}).get('id')
+            self._store(full, dataset_id, r, changed=bool(row) and row[0] != r.headers.get('ETag'))
+        return r
+
+    def _store(self, url, dataset_id, r, changed):
+        with self.lock, self.db:
+            if changed and dataset_id is not None:
+                # a new ETag means the dataset changed: its other pages are stale
+                self.db.execute('DELETE FROM responses WHERE dataset_id = ? AND url != ?',
+                                (dataset_id, url))
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, dataset_id, r.headers.get('ETag'), r.headers.get('Content-Type', ''),
+                 r.content, len(r.content), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self.db.execute('SELECT url, size FROM responses ORDER BY used').fetchall():
+            self.db.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def forget(self, dataset_id):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM responses WHERE dataset_id = ?', (dataset_id,))
+
+    def clear(self):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM responses')
@@ -5,6 +5,7 @@ import SummaryPanel from './components/SummaryPanel';
 import EquipmentTable from './components/EquipmentTable';
 import ChartsPanel from './components/ChartsPanel';
 import HistoryPanel from './components/HistoryPanel';
+import SeriesChart from './components/SeriesChart';
 
 const API = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
@@ -91,14 +92,21 @@ function App() {
         }
     };
 
-    // Generates and downloads PDF report
-    const downloadPdf = async () => {
+    // Downloads the PDF report; the full one may still be rendering (202)
+    const downloadPdf = async (full = false) => {
         if (!dataset) return;
+        const params = full ? { id: dataset.id, full: 1 } : { id: dataset.id };
         try {
-            const r = await axios.get(`${API}/report/?id=${dataset.id}`, { ...headers(), responseType: 'blob' });
+            let r;
+            for (;;) {
+                r = await axios.get(`${API}/report/`, { ...headers(), params, responseType: 'blob' });
+                if (r.status !== 202) break;
+                const wait = parseInt(r.headers['retry-after'] || '5', 10);
+                await new Promise(res => setTimeout(res, wait * 1000));
+            }
             const a = document.createElement('a');
             a.href = URL.createObjectURL(new Blob([r.data]));
-            a.download = `report_${dataset.id}.pdf`;
+            a.download = full ? `report_${dataset.id}_full.pdf` : `report_${dataset.id}.pdf`;
             a.click();
         } catch { }
     };
@@ -191,7 +199,8 @@ function App() {
                         <UploadCard token={token} api={API} onSuccess={onUpload} />
                         {dataset && (
                             <div className="action-buttons">
-                                <button className="btn" onClick={downloadPdf}>📄 Download PDF</button>
+                                <button className="btn" onClick={() => downloadPdf()}>📄 Download PDF</button>
+                                <button className="btn btn-outline" onClick={() => downloadPdf(true)}>📚 Full Report</button>
                             </div>
                         )}
                     </div>
@@ -202,7 +211,9 @@ function App() {
                             {chartData && (
                                 <>
                                     <ChartsPanel chartData={chartData} />
-                                    <EquipmentTable rows={chartData.rows} />
+                                    <SeriesChart api={API} token={token} datasetId={dataset.id}
+                                        columns={Object.keys(chartData.averages)} />
+                                    <EquipmentTable api={API} token={token} datasetId={dataset.id} />
                                 </>
                             )}
                         </>
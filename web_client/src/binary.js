@@ -0,0 +1,83 @@
+import axios from 'axios';
+
+// Table endpoints (/rows/, /series/) can answer in MessagePack: metadata
+// as a map and 'results' as one entry per column. Numeric columns arrive
+// as raw little-endian bytes plus a dtype, so they become typed arrays
+// without parsing a number per cell.
+export const MSGPACK = 'application/msgpack';
+
+// Decodes the MessagePack subset the API emits (no extension types)
+function unpack(buf) {
+    const bytes = new Uint8Array(buf);
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    const text = new TextDecoder();
+    let pos = 0;
+
+    const str = (n) => { const s = text.decode(bytes.subarray(pos, pos + n)); pos += n; return s; };
+    const bin = (n) => { const b = bytes.subarray(pos, pos + n); pos += n; return b; };
+    const arr = (n) => { const a = new Array(n); for (let i = 0; i < n; i++) a[i] = read(); return a; };
+    const map = (n) => { const m = {}; for (let i = 0; i < n; i++) { const k = read(); m[k] = read(); } return m; };
+    const u8 = () => view.getUint8(pos++);
+    const u16 = () => { const v = view.getUint16(pos); pos += 2; return v; };
+    const u32 = () => { const v = view.getUint32(pos); pos += 4; return v; };
+
+    function read() {
+        const t = u8();
+        if (t < 0x80) return t;
+        if (t < 0x90) return map(t & 0x0f);
+        if (t < 0xa0) return arr(t & 0x0f);
+        if (t < 0xc0) return str(t & 0x1f);
+        if (t >= 0xe0) return t - 0x100;
+        let v;
+        switch (t) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return bin(u8());
+            case 0xc5: return bin(u16());
+            case 0xc6: return bin(u32());
+            case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+            case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+            case 0xcc: return u8();
+            case 0xcd: return u16();
+            case 0xce: return u32();
+            case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+            case 0xd0: v = view.getInt8(pos); pos += 1; return v;
+            case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+            case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+            case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+            case 0xd9: return str(u8());
+            case 0xda: return str(u16());
+            case 0xdb: return str(u32());
+            case 0xdc: return arr(u16());
+            case 0xdd: return arr(u32());
+            case 0xde: return map(u16());
+            case 0xdf: return map(u32());
+            default: throw new Error(`Unsupported msgpack type 0x${t.toString(16)}`);
+        }
+    }
+    return read();
+}
+
+const TYPED = { '<f8': Float64Array, '<f4': Float32Array, '<i4': Int32Array, '<i2': Int16Array, '<u1': Uint8Array };
+
+// {dtype, data} -> typed array, any other column stays a plain array
+function column(col) {
+    if (Array.isArray(col)) return col;
+    const copy = col.data.slice();  // aligned copy of the bytes
+    if (col.dtype === '<i8') return Float64Array.from(new BigInt64Array(copy.buffer), Number);
+    return new TYPED[col.dtype](copy.buffer);
+}
+
+// GET a table endpoint; resolves to the payload with results as {column: array}
+export async function getTable(url, params, token) {
+    const r = await axios.get(url, {
+        params,
+        responseType: 'arraybuffer',
+        headers: { Authorization: `Token ${token}`, Accept: MSGPACK },
+    });
+    const payload = unpack(r.data);
+    const results = {};
+    for (const [name, col] of Object.entries(payload.results || {})) results[name] = column(col);
+    return { ...payload, results };
+}
@@ -1,9 +1,36 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
+import { getTable } from '../binary';
 
-// Scrollable data table
-function EquipmentTable({ rows }) {
-    if (!rows || !rows.length) return null;
-    const cols = Object.keys(rows[0]);
+const PAGE = 50;
+
+// Scrollable data table, paged and sorted on the server
+function EquipmentTable({ api, token, datasetId }) {
+    const [page, setPage] = useState(null);
+    const [offset, setOffset] = useState(0);
+    const [ordering, setOrdering] = useState('');
+
+    useEffect(() => { setOffset(0); setOrdering(''); }, [datasetId]);
+
+    useEffect(() => {
+        if (!datasetId) return;
+        const params = { id: datasetId, offset, limit: PAGE };
+        if (ordering) params.ordering = ordering;
+        getTable(`${api}/rows/`, params, token)
+            .then(setPage)
+            .catch(() => setPage(null));
+    }, [api, token, datasetId, offset, ordering]);
+
+    const cols = page ? page.columns : [];
+    const size = cols.length ? page.results[cols[0]].length : 0;
+    if (!size) return null;
+    // NaN marks a missing value in numeric columns
+    const cell = (v) => (v === null || Number.isNaN(v) ? '' : v);
+
+    // click a header to sort, click again to flip direction
+    const sortBy = (c) => {
+        setOrdering(ordering === c ? `-${c}` : c);
+        setOffset(0);
+    };
 
     return (
         <div className="card">
@@ -11,15 +38,28 @@ function EquipmentTable({ rows }) {
             <div className="table-scroll">
                 <table className="data-table">
                     <thead>
-                        <tr>{cols.map(c => <th key={c}>{c}</th>)}</tr>
+                        <tr>{cols.map(c => (
+                            <th key={c} onClick={() => sortBy(c)} style={{ cursor: 'pointer' }}>
+                                {c}{ordering === c ? ' ▲' : ordering === `-${c}` ? ' ▼' : ''}
+                            </th>
+                        ))}</tr>
                     </thead>
                     <tbody>
-                        {rows.map((row, i) => (
-                            <tr key={i}>{cols.map(c => <td key={c}>{row[c]}</td>)}</tr>
+                        {Array.from({ length: size }, (_, i) => (
+                            <tr key={offset + i}>{cols.map(c => <td key={c}>{cell(page.results[c][i])}</td>)}</tr>
                         ))}
                     </tbody>
                 </table>
             </div>
+            <div className="pager">
+                <button className="btn btn-small" disabled={!page.previous}
+                    onClick={() => setOffset(Math.max(0, offset - PAGE))}>Prev</button>
+                <span className="pager-info">
+                    {offset + 1}–{offset + size} of {page.count}
+                </span>
+                <button className="btn btn-small" disabled={!page.next}
+                    onClick={() => setOffset(offset + PAGE)}>Next</button>
+            </div>
         </div>
     );
 }
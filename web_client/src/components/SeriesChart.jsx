@@ -0,0 +1,70 @@
+import React, { useState, useEffect } from 'react';
+import { Line } from 'react-chartjs-2';
+import { getTable } from '../binary';
+
+const COLORS = ['#3b82f6', '#8b5cf6', '#ec4899', '#fb923c', '#22c55e', '#14b8a6'];
+
+// Line chart of one column, downsampled on the server to the chart's width
+function SeriesChart({ api, token, datasetId, columns }) {
+    const [column, setColumn] = useState(columns[0]);
+    const [byType, setByType] = useState(false);
+    const [data, setData] = useState(null);
+
+    useEffect(() => { if (!columns.includes(column)) setColumn(columns[0]); }, [columns, column]);
+
+    useEffect(() => {
+        if (!datasetId || !column) return;
+        const params = { id: datasetId, column, points: 800 };
+        if (byType) params.group_by = 'Type';
+        getTable(`${api}/series/`, params, token)
+            .then(setData)
+            .catch(() => setData(null));
+    }, [api, token, datasetId, column, byType]);
+
+    if (!columns.length) return null;
+
+    // results is one long table: series name, row index and value per point
+    const points = {};
+    if (data) {
+        const { series, x, y } = data.results;
+        for (let i = 0; i < x.length; i++) (points[series[i]] ||= []).push({ x: x[i], y: y[i] });
+    }
+    const lineData = {
+        datasets: Object.entries(points).map(([name, pts], i) => ({
+            label: name,
+            data: pts,
+            borderColor: COLORS[i % COLORS.length],
+            borderWidth: 1.5,
+            pointRadius: 0,
+        }))
+    };
+
+    const options = {
+        responsive: true,
+        animation: false,
+        parsing: false,
+        plugins: { legend: { display: byType } },
+        scales: {
+            x: { type: 'linear', title: { display: true, text: 'Row' }, ticks: { color: '#888' } },
+            y: { ticks: { color: '#888' }, grid: { color: 'rgba(128, 128, 128, 0.1)' } }
+        }
+    };
+
+    return (
+        <div className="card">
+            <h2>📈 {column} by Row</h2>
+            <div className="pager">
+                <select value={column} onChange={e => setColumn(e.target.value)}>
+                    {columns.map(c => <option key={c} value={c}>{c}</option>)}
+                </select>
+                <label className="pager-info">
+                    <input type="checkbox" checked={byType} onChange={e => setByType(e.target.checked)} /> Split by Type
+                </label>
+            </div>
+            {data && <Line data={lineData} options={options} />}
+            {data && <p className="status-text">{data.total} rows, showing a {data.method} sample</p>}
+        </div>
+    );
+}
+
+export default SeriesChart;
@@ -2,7 +2,8 @@ import React from 'react';
 
 function SummaryPanel({ summary }) {
     if (!summary) return null;
-    const { total_count, averages, type_distribution } = summary;
+    const { total_count, averages, type_distribution, columns } = summary;
+    const statKeys = ['min', 'max', 'std', 'p50', 'p95', 'p99', 'nulls'];
 
     return (
         <div className="card">
@@ -19,6 +20,20 @@ function SummaryPanel({ summary }) {
                     </div>
                 ))}
             </div>
+            {columns && Object.keys(columns).length > 0 && (
+                <div className="table-scroll mt">
+                    <table className="data-table">
+                        <thead>
+                            <tr><th>Column</th>{statKeys.map(k => <th key={k}>{k}</th>)}</tr>
+                        </thead>
+                        <tbody>
+                            {Object.entries(columns).map(([col, st]) => (
+                                <tr key={col}><td>{col}</td>{statKeys.map(k => <td key={k}>{st[k] ?? '–'}</td>)}</tr>
+                            ))}
+                        </tbody>
+                    </table>
+                </div>
+            )}
             {type_distribution && (
                 <p className="status-text mt">
                     Types: {Object.entries(type_distribution).map(([t, c]) => `${t} (${c})`).join(', ')}
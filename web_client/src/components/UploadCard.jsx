@@ -1,23 +1,62 @@
 import React, { useState } from 'react';
 import axios from 'axios';
 
+const POLL_MS = 500;
+const CHUNK_RETRIES = 3;
+
+const sleep = (ms) => new Promise(res => setTimeout(res, ms));
+
 function UploadCard({ token, api, onSuccess }) {
     const [file, setFile] = useState(null);
     const [busy, setBusy] = useState(false);
     const [msg, setMsg] = useState('');
 
+    // Polls the upload job until the server has parsed the file
+    const waitForJob = async (id, auth) => {
+        for (;;) {
+            const r = await axios.get(`${api}/jobs/${id}/`, auth);
+            if (r.data.status === 'done') return r.data.dataset;
+            if (r.data.status === 'failed') throw new Error(r.data.error || 'Upload failed.');
+            setMsg(`Processing... ${r.data.progress}%`);
+            await sleep(POLL_MS);
+        }
+    };
+
+    // Sends the file in chunks, resuming from the server's next_chunk on errors
+    const sendChunks = async (auth) => {
+        const init = await axios.post(`${api}/uploads/`, { name: file.name, size: file.size }, auth);
+        const { id, chunk_size } = init.data;
+        let n = init.data.next_chunk;
+        let failures = 0;
+        while (n * chunk_size < file.size) {
+            const blob = file.slice(n * chunk_size, (n + 1) * chunk_size);
+            try {
+                const r = await axios.put(`${api}/uploads/${id}/chunks/${n}/`, blob, {
+                    headers: { ...auth.headers, 'Content-Type': 'application/octet-stream' }
+                });
+                n = r.data.next_chunk;
+                failures = 0;
+            } catch (err) {
+                if (++failures > CHUNK_RETRIES) throw err;
+                const s = await axios.get(`${api}/uploads/${id}/`, auth);
+                n = s.data.next_chunk;
+            }
+            setMsg(`Uploading... ${Math.floor(Math.min(n * chunk_size, file.size) * 100 / file.size)}%`);
+        }
+        return axios.post(`${api}/uploads/${id}/finalize/`, null, auth);
+    };
+
     const upload = async () => {
         if (!file) { setMsg('Select a CSV file.'); return; }
         setBusy(true); setMsg('Uploading...');
-        const fd = new FormData();
-        fd.append('file', file);
+        const auth = { headers: { Authorization: `Token ${token}` } };
         try {
-            const r = await axios.post(`${api}/upload/`, fd, {
-                headers: { Authorization: `Token ${token}`, 'Content-Type': 'multipart/form-data' }
-            });
-            setMsg(`Uploaded: ${r.data.name}`);
-            onSuccess(r.data);
-        } catch (err) { setMsg(err.response?.data?.error || 'Upload failed.'); }
+            const r = await sendChunks(auth);
+            // a file the server already has comes back as a finished job
+            const ds = r.data.status === 'done' ? r.data.dataset : await waitForJob(r.data.id, auth);
+            setMsg(`Uploaded: ${ds.name}`);
+            onSuccess(ds);
+        } catch (err) { setMsg(err.response?.data?.error || err.message || 'Upload failed.'); }
         finally { setBusy(false); }
     };
 